@@ -0,0 +1,9 @@
+import sys
+
+from .engines import (
+    main,
+    parse_args
+)
+
+if __name__ == '__main__':
+    sys.exit(main(parse_args()))
@@ -0,0 +1,325 @@
+import os
+import sys
+import json
+import shutil
+import logging
+import argparse
+import platform
+import statistics
+
+from datetime import (
+    datetime,
+    timezone
+)
+from time import perf_counter_ns
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import pyarrow as pa
+import pyarrow.csv as pc
+
+from fsspec.implementations.local import LocalFileSystem
+
+from ..datagen import (
+    Vocabulary,
+    generate_table
+)
+from ..core.extractors import CsvFileExtractor
+from ..core.transformers import QueryTransformer
+from ..core.storages import CsvStorage
+
+try:
+    import resource
+except ImportError:  # windows
+    resource = None
+
+READ_PACKAGES = ['arrow', 'arrow_ds', 'pandas', 'polars', 'duckdb']
+TRANSFORM_PACKAGES = ['polars', 'duckdb']
+WRITE_PACKAGES = ['arrow', 'arrow_ds', 'pandas', 'polars', 'duckdb']
+
+TABLE_NAME = 'synthetic'
+QUERY = f'SELECT * FROM {TABLE_NAME} WHERE id % 5 = 0'
+
+
+def _peak_rss_mb() -> float | None:
+    if resource is None:
+        return None
+
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # linux reports kilobytes, macos bytes
+    return max_rss / (1024 * 1024) if sys.platform == 'darwin' else max_rss / 1024
+
+
+def _path_size(path: str) -> int:
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+
+    return sum(
+        os.path.getsize(os.path.join(root, file))
+        for root, _, files in os.walk(path)
+        for file in files
+    )
+
+
+def _make_stage(case: dict, out_dir: str):
+    fs = LocalFileSystem(auto_mkdir=True)
+    package = case['package']
+
+    if case['stage'] == 'read':
+        extractor = CsvFileExtractor(
+            config_dict={'name': 'bench_read', 'storage_backend': 'fs', 'path': out_dir, 'use_package': package},
+            transformer=None
+        )
+        return lambda: extractor._read(fs, case['source'])
+
+    data = pc.read_csv(case['source'])
+
+    if case['stage'] == 'transform':
+        transformer = QueryTransformer(
+            config_dict={'name': 'bench_transform', 'use_package': package, 'table_name': TABLE_NAME, 'query': QUERY},
+            storage=None
+        )
+        return lambda: transformer.do_transform(data)
+
+    storage = CsvStorage(
+        config_dict={'name': 'bench_write', 'storage_backend': 'fs', 'path': out_dir, 'key': 'bench',
+                     'use_package': package, 'time_fmt': '%Y%m%dT%H%M%S%f'}
+    )
+
+    def write():
+        storage._write_csv(fs, data)
+        return data
+
+    return write
+
+
+def run_case(case: dict) -> dict:
+    # runs in a fresh process so peak RSS belongs to this case only
+    logging.disable(logging.CRITICAL)
+
+    out_dir = os.path.join(case['workdir'], f"out-{case['stage']}-{case['package']}")
+    os.makedirs(out_dir, exist_ok=True)
+
+    stage = _make_stage(case, out_dir)
+    wall_s = []
+    output_bytes = None
+    num_rows = 0
+
+    for i in range(case['warmup'] + case['repeat']):
+        shutil.rmtree(out_dir, ignore_errors=True)
+        os.makedirs(out_dir, exist_ok=True)
+
+        start_ns = perf_counter_ns()
+        result = stage()
+        elapsed_ns = perf_counter_ns() - start_ns
+
+        if i >= case['warmup']:
+            wall_s.append(elapsed_ns / 1_000_000_000)
+
+        num_rows = result.num_rows if case['stage'] != 'transform' else case['rows']
+
+    if case['stage'] == 'write':
+        output_bytes = _path_size(out_dir)
+
+    shutil.rmtree(out_dir, ignore_errors=True)
+
+    median_s = statistics.median(wall_s)
+
+    return {
+        'stage': case['stage'],
+        'package': case['package'],
+        'rows': case['rows'],
+        'wall_s': wall_s,
+        'median_s': median_s,
+        'min_s': min(wall_s),
+        'rows_per_s': num_rows / median_s if median_s > 0 else None,
+        'peak_rss_mb': _peak_rss_mb(),
+        'output_bytes': output_bytes
+    }
+
+
+def prepare_datasets(workdir: str, scales: list[int], seed: int) -> dict[int, str]:
+    datasets = {}
+    vocabulary = None
+
+    for n_rows in scales:
+        file_path = os.path.join(workdir, f'synthetic_{n_rows}_seed{seed}.csv')
+
+        if not os.path.exists(file_path):
+            vocabulary = Vocabulary(seed) if vocabulary is None else vocabulary
+            pc.write_csv(generate_table(n_rows, seed=seed, vocabulary=vocabulary), file_path)
+
+        datasets[n_rows] = file_path
+
+    return datasets
+
+
+def build_cases(args, datasets: dict[int, str]) -> list[dict]:
+    stages: dict = {
+        'read': READ_PACKAGES,
+        'transform': TRANSFORM_PACKAGES,
+        'write': WRITE_PACKAGES
+    }
+
+    return [
+        {
+            'stage': stage,
+            'package': package,
+            'rows': n_rows,
+            'source': source,
+            'workdir': args.workdir,
+            'warmup': args.warmup,
+            'repeat': args.repeat
+        }
+        for n_rows, source in datasets.items()
+        for stage in args.stages
+        for package in stages[stage]
+        if args.packages is None or package in args.packages
+    ]
+
+
+def compare(results: list[dict], baseline_path: str, threshold: float) -> list[str]:
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+
+    baseline_cases = {(r['stage'], r['package'], r['rows']): r for r in baseline['results']}
+    regressions = []
+
+    for result in results:
+        previous = baseline_cases.get((result['stage'], result['package'], result['rows']))
+
+        if previous is None:
+            continue
+
+        change = result['median_s'] / previous['median_s'] - 1
+
+        if change > threshold:
+            regressions.append(
+                f"{result['stage']}/{result['package']}/{result['rows']}: "
+                f"{previous['median_s']:.3f}s -> {result['median_s']:.3f}s ({change:+.0%})"
+            )
+
+    return regressions
+
+
+def main(args) -> int:
+    os.makedirs(args.workdir, exist_ok=True)
+
+    datasets = prepare_datasets(args.workdir, args.scales, args.seed)
+    cases = build_cases(args, datasets)
+    results = []
+    failures = []
+
+    for case in cases:
+        try:
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as pool:
+                result = pool.submit(run_case, case).result()
+        except Exception as e:
+            print(f"{case['stage']:<10} {case['package']:<9} {case['rows']:>11,} rows  failed: {e}")
+            failures.append({'stage': case['stage'], 'package': case['package'], 'rows': case['rows'],
+                             'error': str(e)})
+            continue
+
+        results.append(result)
+        print(f"{result['stage']:<10} {result['package']:<9} {result['rows']:>11,} rows  "
+              f"{result['median_s']:>8.3f}s  {result['rows_per_s'] or 0:>14,.0f} rows/s  "
+              f"peak {result['peak_rss_mb'] or 0:>8.1f}MB")
+
+    report = {
+        'meta': {
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'pyarrow': pa.__version__,
+            'seed': args.seed,
+            'warmup': args.warmup,
+            'repeat': args.repeat,
+            'query': QUERY
+        },
+        'results': results,
+        'failures': failures
+    }
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    print(f'results written to [{args.output}]')
+
+    if args.compare is not None:
+        regressions = compare(results, args.compare, args.threshold)
+
+        for regression in regressions:
+            print(f'regression: {regression}')
+
+        if bool(regressions):
+            return 1
+
+    return 1 if bool(failures) else 0
+
+
+def parse_args(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(prog='python -m app.bench')
+    parser.add_argument(
+        '--scales',
+        help='number of rows of each generated dataset',
+        nargs='+',
+        type=int,
+        default=[100_000]
+    )
+    parser.add_argument(
+        '--stages',
+        help='stages to benchmark',
+        nargs='+',
+        choices=['read', 'transform', 'write'],
+        default=['read', 'transform', 'write']
+    )
+    parser.add_argument(
+        '--packages',
+        help="limit the benchmark to these 'use_package' values",
+        nargs='+',
+        default=None
+    )
+    parser.add_argument(
+        '--warmup',
+        help='untimed runs per case',
+        type=int,
+        default=1
+    )
+    parser.add_argument(
+        '--repeat',
+        help='timed runs per case',
+        type=int,
+        default=3
+    )
+    parser.add_argument(
+        '--seed',
+        help='dataset seed',
+        type=int,
+        default=0
+    )
+    parser.add_argument(
+        '--workdir',
+        help='directory for generated datasets and outputs',
+        default=os.path.join(os.getcwd(), 'bench_data')
+    )
+    parser.add_argument(
+        '--output',
+        help='json results file',
+        default='bench_results.json'
+    )
+    parser.add_argument(
+        '--compare',
+        help='previous json results file to compare against',
+        default=None
+    )
+    parser.add_argument(
+        '--threshold',
+        help='relative slowdown of the median reported as a regression',
+        type=float,
+        default=0.10
+    )
+
+    return parser.parse_args(argv)
+
+
+__all__ = ['run_case', 'main', 'parse_args']
@@ -0,0 +1,80 @@
+import sys
+import argparse
+import subprocess
+
+from ..core.engines import EngineManager
+
+DEFAULT_MODULE = 'app.main'
+
+
+def measure_imports(module: str) -> list[tuple[str, int, int]]:
+    # run a fresh interpreter with -X importtime, rows are (module, self_us, cumulative_us)
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True,
+        text=True,
+        check=True
+    )
+
+    rows = []
+
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+
+        self_us, cumulative_us, name = line.removeprefix('import time:').split('|')
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+
+    return rows
+
+
+def main(args) -> int:
+    rows = measure_imports(args.module)
+    imported = {name for name, _, _ in rows}
+
+    total_us = next(cumulative_us for name, _, cumulative_us in rows if name == args.module)
+    print(f'import {args.module}: {total_us / 1000:.1f}ms')
+
+    print(f'top {args.top} imports by cumulative time:')
+    for name, self_us, cumulative_us in sorted(rows, key=lambda row: row[2], reverse=True)[:args.top]:
+        print(f'  {cumulative_us / 1000:>9.1f}ms  {self_us / 1000:>8.1f}ms  {name}')
+
+    # optional engines must stay lazy, a module level import shows up here
+    eager_engines = [name for name, module_name in EngineManager.ENGINES.items() if module_name in imported]
+
+    if bool(eager_engines):
+        print(f'engines imported at startup: {eager_engines}')
+        return 1
+
+    if args.max_ms is not None and total_us / 1000 > args.max_ms:
+        print(f'startup exceeds the budget of {args.max_ms}ms')
+        return 1
+
+    print('no optional engine imported at startup')
+    return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--module',
+        help='module to import',
+        required=False,
+        default=DEFAULT_MODULE
+    )
+    parser.add_argument(
+        '--top',
+        help='number of imports to report',
+        required=False,
+        type=int,
+        default=15
+    )
+    parser.add_argument(
+        '--max-ms',
+        help='fail when the import takes longer than this many milliseconds',
+        required=False,
+        type=float,
+        default=None
+    )
+
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,92 @@
+import os
+import logging
+import threading
+
+from .engines import EngineManager
+from ..schemas import MemoryBudgetParams
+
+duckdb = EngineManager.get_engine('duckdb')
+
+
+class MemoryBudget(object):
+    # process wide memory budget of the 'meta.memory' config, without 'memory_limit' nothing is capped
+
+    def __init__(self) -> None:
+        self.logger = logging.getLogger('memory_budget')
+        self.params = MemoryBudgetParams()
+        self.__duckdb_conn = None
+        self.__local = threading.local()
+
+    def configure(self, config_dict: dict | None):
+        self.params = MemoryBudgetParams.model_validate(config_dict or {})
+        self.__duckdb_conn = None
+
+        if self.params.temp_directory is not None:
+            os.makedirs(self.params.temp_directory, exist_ok=True)
+
+        if self.enabled:
+            self.logger.info(f"memory budget of {self.limit_bytes} byte(s), 'temp_directory' = "
+                             f"{self.params.temp_directory}, 'polars_streaming' = {self.params.polars_streaming}")
+
+    @property
+    def limit_bytes(self) -> int | None:
+        return self.params.limit_bytes
+
+    @property
+    def enabled(self) -> bool:
+        return self.limit_bytes is not None
+
+    @property
+    def polars_streaming(self) -> bool:
+        return self.enabled and self.params.polars_streaming
+
+    def buffer_bytes(self) -> int | None:
+        # share of the budget one extractor or storage may hold in memory at once
+        return None if not self.enabled else int(self.limit_bytes * self.params.buffer_fraction)
+
+    def duckdb_config(self) -> dict:
+        config = {}
+
+        if self.enabled:
+            config['memory_limit'] = f'{self.limit_bytes}B'
+
+        if self.params.temp_directory is not None:
+            config['temp_directory'] = self.params.temp_directory
+
+        if self.params.threads is not None:
+            config['threads'] = self.params.threads
+
+        return config
+
+    def duckdb_csv_options(self) -> str:
+        # read_csv buffers of 8MB per thread alone exceed small limits
+        if not self.enabled:
+            return ''
+
+        return f', buffer_size={max(1 << 16, min(1 << 23, self.limit_bytes // 8))}'
+
+    def duckdb_connection(self):
+        # a dedicated connection spills sorts, joins and aggregations to 'temp_directory' at the limit
+        if not bool(self.duckdb_config()):
+            return duckdb.default_connection
+
+        if self.__duckdb_conn is None:
+            self.__duckdb_conn = duckdb.connect(':memory:', config=self.duckdb_config())
+
+        return self.__duckdb_conn
+
+    def duckdb_cursor(self):
+        # one cursor per thread, concurrent stages deadlock on a shared duckdb connection
+        conn = self.duckdb_connection()
+
+        if getattr(self.__local, 'conn', None) is not conn:
+            self.__local.conn = conn
+            self.__local.cursor = conn.cursor()
+
+        return self.__local.cursor
+
+
+BUDGET = MemoryBudget()
+
+
+__all__ = ['MemoryBudget', 'BUDGET']
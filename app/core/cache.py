@@ -0,0 +1,153 @@
+import os
+import re
+import json
+import hashlib
+import logging
+
+import pyarrow as pa
+
+from contextvars import ContextVar
+
+from .engines import EngineManager
+from .metrics import METRICS
+from ..schemas import ResultCacheParams
+
+pq = EngineManager.get_engine('parquet')
+
+# lineage of the data currently flowing through a pipeline, None when it can not be identified
+_fingerprint: ContextVar[str | None] = ContextVar('input_fingerprint', default=None)
+
+
+def current_fingerprint() -> str | None:
+    return _fingerprint.get()
+
+
+def set_fingerprint(fingerprint: str | None):
+    return _fingerprint.set(fingerprint)
+
+
+def reset_fingerprint(token):
+    _fingerprint.reset(token)
+
+
+def _digest(payload) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def fingerprint_files(files: list[dict]) -> str:
+    # identity of an input file set: path, size and mtime of every file
+    return _digest(sorted([file['name'], file.get('size'), file.get('mtime')] for file in files))
+
+
+def derive_fingerprint(fingerprint: str | None, signature: dict | None) -> str | None:
+    # a stage without signature does not change its input
+    if fingerprint is None or signature is None:
+        return fingerprint
+
+    return _digest([fingerprint, signature])
+
+
+def normalize_query(query: str) -> str:
+    # collapse whitespace outside of string literals
+    parts = re.split(r"('(?:[^']|'')*')", query.strip())
+    return ''.join(part if i % 2 == 1 else ' '.join(part.split()) for i, part in enumerate(parts))
+
+
+class ResultCache(object):
+    # on-disk query results keyed by lineage fingerprint, least recently used entries are evicted first
+
+    def __init__(self) -> None:
+        self.logger = logging.getLogger('result_cache')
+        self.params = ResultCacheParams()
+
+    def configure(self, config_dict: dict | None):
+        self.params = ResultCacheParams.model_validate(config_dict or {})
+
+        if self.enabled:
+            os.makedirs(self.params.dir, exist_ok=True)
+            self.logger.info(f"result cache in [{self.params.dir}] using 'format' = {self.params.format}, "
+                             f"'max_size' = {self.params.max_bytes} byte(s)")
+            self._evict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.params.dir is not None
+
+    @property
+    def file_ext(self) -> str:
+        return 'arrow' if self.params.format == 'ipc' else 'parquet'
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.params.dir, f'{key}.{self.file_ext}')
+
+    def get(self, key: str) -> pa.Table | None:
+        path = self._path(key)
+
+        if not os.path.exists(path):
+            METRICS.increment('cache_misses')
+            return None
+
+        if self.params.format == 'ipc':
+            with pa.OSFile(path) as f:
+                table = pa.ipc.open_file(f).read_all()
+        else:
+            table = pq.read_table(path)
+
+        # the mtime is the recency of an entry
+        os.utime(path)
+        METRICS.increment('cache_hits')
+
+        return table
+
+    def put(self, key: str, table: pa.Table):
+        path = self._path(key)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+
+        if self.params.format == 'ipc':
+            with pa.OSFile(tmp_path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        else:
+            pq.write_table(table, tmp_path)
+
+        os.replace(tmp_path, path)
+        METRICS.increment('cache_bytes_written', os.path.getsize(path))
+
+        self._evict()
+
+    def _evict(self):
+        if self.params.max_bytes is None:
+            return
+
+        entries = []
+
+        with os.scandir(self.params.dir) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.endswith(f'.{self.file_ext}'):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total_bytes = sum(size for _, size, _ in entries)
+
+        for _, size, path in sorted(entries):
+            if total_bytes <= self.params.max_bytes:
+                break
+
+            os.remove(path)
+            total_bytes -= size
+            METRICS.increment('cache_evictions')
+            self.logger.debug(f'evicted [{path}]')
+
+
+RESULT_CACHE = ResultCache()
+
+
+__all__ = [
+    'ResultCache',
+    'RESULT_CACHE',
+    'current_fingerprint',
+    'set_fingerprint',
+    'reset_fingerprint',
+    'fingerprint_files',
+    'derive_fingerprint',
+    'normalize_query'
+]
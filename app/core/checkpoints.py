@@ -0,0 +1,105 @@
+import hashlib
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+
+from .housekeeping import HousekeepingLedger
+
+_checkpoint: ContextVar['Checkpoint | None'] = ContextVar('checkpoint', default=None)
+# a fresh token per extraction, stages redo their once-per-run work in the next one (a watch poll)
+_run: ContextVar['object | None'] = ContextVar('run', default=None)
+
+
+class Checkpoint(object):
+    # progress of one item (a file or a set of files) of a run, shared by the stages that process it
+
+    def __init__(self, ledger: HousekeepingLedger, run_id: int, attempt_started: datetime, item: str,
+                 every_batches: int | None = None, resumed: bool = False) -> None:
+        self.ledger = ledger
+        self.run_id = run_id
+        self.item = item
+        self.every_batches = every_batches
+        # earlier attempts of the run already stored data, storages must not replace it
+        self.resumed = resumed
+        self.owner: str | None = None
+
+        batches, state, started = ledger.get_item(run_id, item)
+
+        # an item started by an earlier attempt keeps its start, a retry writes over its partial output
+        if started is None:
+            started = attempt_started
+            ledger.start_item(run_id, item, started)
+
+        self.started: datetime = started
+        self.skip_batches: int = batches
+        self.batches: int = batches
+        self.state: dict = state
+
+    def output_name(self, key: str, time_fmt: str) -> str:
+        # the same for every attempt of an item, a resumed item overwrites its partial output
+        digest = hashlib.sha1(self.item.encode('utf-8')).hexdigest()[:10]
+        return f'{key}-{self.started.strftime(time_fmt)}-{digest}'
+
+    def claim(self, owner: str) -> bool:
+        # batch checkpoints follow a single storage, batches must map 1:1 to the extracted batches
+        if self.every_batches is None:
+            return False
+
+        if self.owner is None:
+            self.owner = owner
+
+        return self.owner == owner
+
+    def batch_written(self) -> bool:
+        self.batches += 1
+        return self.batches % self.every_batches == 0
+
+    def commit_batches(self, state: dict):
+        self.state = state
+        self.ledger.save_checkpoint(self.run_id, self.item, self.batches, state)
+
+
+def current_run() -> object | None:
+    return _run.get()
+
+
+@contextmanager
+def run_scope():
+    token = _run.set(object())
+
+    try:
+        yield
+    finally:
+        _run.reset(token)
+
+
+def current_checkpoint() -> Checkpoint | None:
+    return _checkpoint.get()
+
+
+def disable_batch_checkpoints():
+    checkpoint = _checkpoint.get()
+
+    if checkpoint is not None:
+        checkpoint.every_batches = None
+
+
+@contextmanager
+def checkpoint_scope(checkpoint: Checkpoint | None):
+    token = _checkpoint.set(checkpoint)
+
+    try:
+        yield checkpoint
+    finally:
+        _checkpoint.reset(token)
+
+
+__all__ = [
+    'Checkpoint',
+    'current_run',
+    'run_scope',
+    'current_checkpoint',
+    'disable_batch_checkpoints',
+    'checkpoint_scope'
+]
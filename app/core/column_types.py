@@ -0,0 +1,64 @@
+import re
+
+import pyarrow as pa
+
+from .budget import BUDGET
+from .engines import EngineManager
+
+pd = EngineManager.get_engine('pandas')
+pl = EngineManager.get_engine('polars')
+
+
+def parse_type(name: str) -> pa.DataType:
+    # arrow type names as printed by pyarrow: int64, double, string, date32[day], timestamp[us, tz=UTC], ...
+    match = re.fullmatch(r'timestamp\[(\w+)(?:, tz=(.+))?\]', name.strip())
+
+    if match is not None:
+        return pa.timestamp(match[1], match[2])
+
+    match = re.fullmatch(r'decimal(?:128)?\((\d+), ?(\d+)\)', name.strip())
+
+    if match is not None:
+        return pa.decimal128(int(match[1]), int(match[2]))
+
+    return pa.type_for_alias(name.strip())
+
+
+def parse_schema(columns: dict[str, str]) -> pa.Schema:
+    return pa.schema([(name, parse_type(type_name)) for name, type_name in columns.items()])
+
+
+def schema_to_dict(schema: pa.Schema) -> dict[str, str]:
+    return {field.name: str(field.type) for field in schema}
+
+
+def complete_schema(schema: pa.Schema) -> pa.Schema:
+    # columns without a single value in the inferred block are read as strings
+    return pa.schema([
+        (field.name, pa.string() if pa.types.is_null(field.type) else field.type) for field in schema
+    ])
+
+
+def pandas_dtypes(schema: pa.Schema) -> dict:
+    # arrow backed columns, pandas parses into the arrow types directly
+    return {field.name: pd.ArrowDtype(field.type) for field in schema}
+
+
+def polars_schema(schema: pa.Schema) -> dict:
+    return dict(pl.from_arrow(schema.empty_table()).schema)
+
+
+def duckdb_columns(schema: pa.Schema) -> dict[str, str]:
+    relation = BUDGET.duckdb_cursor().from_arrow(schema.empty_table())
+    return {name: str(column_type) for name, column_type in zip(relation.columns, relation.types)}
+
+
+__all__ = [
+    'parse_type',
+    'parse_schema',
+    'schema_to_dict',
+    'complete_schema',
+    'pandas_dtypes',
+    'polars_schema',
+    'duckdb_columns'
+]
@@ -0,0 +1,64 @@
+import sys
+import logging
+import importlib
+
+from types import ModuleType
+
+
+class LazyEngine(object):
+    # module proxy, the engine is imported on first attribute access
+
+    def __init__(self, name: str, module_name: str) -> None:
+        self._name = name
+        self._module_name = module_name
+        self._module: ModuleType | None = None
+
+    def load(self) -> ModuleType:
+        if self._module is None:
+            logging.getLogger('engines').debug(f'import engine [{self._name}] from [{self._module_name}]')
+            self._module = importlib.import_module(self._module_name)
+
+        return self._module
+
+    def __getattr__(self, attr: str):
+        return getattr(self.load(), attr)
+
+    def __repr__(self) -> str:
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f'LazyEngine({self._name}, {state})'
+
+
+class EngineManager(object):
+    # optional engines, only imported once a configured stage uses them
+    ENGINES: dict = {
+        'pandas': 'pandas',
+        'polars': 'polars',
+        'duckdb': 'duckdb',
+        'arrow_ds': 'pyarrow.dataset',
+        'parquet': 'pyarrow.parquet'
+    }
+
+    __engines: dict = {}
+
+    @classmethod
+    def register_engine(cls, name: str, module_name: str):
+        cls.ENGINES[name] = module_name
+        cls.__engines.pop(name, None)
+
+    @classmethod
+    def get_engine(cls, name: str) -> LazyEngine:
+        module_name = cls.ENGINES.get(name, None)
+
+        assert module_name is not None, f'unknown engine: [{name}]'
+
+        if name not in cls.__engines:
+            cls.__engines[name] = LazyEngine(name, module_name)
+
+        return cls.__engines[name]
+
+    @classmethod
+    def loaded_engines(cls) -> list[str]:
+        return [name for name, module_name in cls.ENGINES.items() if module_name in sys.modules]
+
+
+__all__ = ['LazyEngine', 'EngineManager']
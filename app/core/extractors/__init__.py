@@ -1,7 +1,11 @@
 from .base import BaseExtractor
 from .files import (
-    CsvFileExtractor
+    CsvFileExtractor,
+    ParquetFileExtractor,
+    ArrowIpcFileExtractor,
+    JsonLinesFileExtractor
 )
+from .database import DatabaseExtractor
 
 from ..transformers import BaseTransformer
 
@@ -9,7 +13,11 @@ from ..transformers import BaseTransformer
 class ExtractorManager(object):
     EXTRACTORS: dict = {
         BaseExtractor.TYPE: BaseExtractor,
-        CsvFileExtractor.TYPE: CsvFileExtractor
+        CsvFileExtractor.TYPE: CsvFileExtractor,
+        ParquetFileExtractor.TYPE: ParquetFileExtractor,
+        ArrowIpcFileExtractor.TYPE: ArrowIpcFileExtractor,
+        JsonLinesFileExtractor.TYPE: JsonLinesFileExtractor,
+        DatabaseExtractor.TYPE: DatabaseExtractor
     }
 
     @classmethod
@@ -1,11 +1,16 @@
 import logging
-from time import perf_counter_ns
 from abc import (
     ABC,
     abstractmethod
 )
 
 from ..transformers import BaseTransformer
+from ..metrics import StageMetrics
+from ..checkpoints import run_scope
+from ..cache import (
+    set_fingerprint,
+    reset_fingerprint
+)
 from ...utils import format_perf_ns_to_time
 
 
@@ -19,27 +24,36 @@ class BaseExtractor(ABC):
         self.transformer = transformer
         self.name = self.config_dict['name']
         self.logger = logging.getLogger(self.name)
+        self.metrics = StageMetrics('extractor', self.name, self.config_dict)
+        self.fingerprint: str | None = None
 
     def _extract(self):
-        start_ns = perf_counter_ns()
+        self.is_transformed = False
+        self.fingerprint = None
 
-        data = self.do_extract()
+        with run_scope():
+            with self.metrics.measure() as run:
+                data = run.output(self.do_extract())
 
-        end_ns = perf_counter_ns()
-        elapsed_ns = end_ns - start_ns
-        formatted_time = format_perf_ns_to_time(elapsed_ns)
+            formatted_time = format_perf_ns_to_time(run.wall_ns)
 
-        self.logger.info(f'extractor [{self.name}] completed in {formatted_time}')
+            self.logger.info(f'extractor [{self.name}] completed in {formatted_time}')
 
-        if data is not None:
-            self.call_transformer(data)
-            self.is_transformed = True
+            if data is not None:
+                self.call_transformer(data, self.fingerprint)
+                self.is_transformed = True
 
         if not self.is_transformed:
             self.logger.warning(f'process terminated: no data found to proceed')
 
-    def call_transformer(self, data):
-        self.transformer._transform(data)
+    def call_transformer(self, data, fingerprint: str | None = None):
+        # the fingerprint identifies the input, transformers derive cache keys from it
+        token = set_fingerprint(fingerprint)
+
+        try:
+            self.transformer._transform(data)
+        finally:
+            reset_fingerprint(token)
 
     @abstractmethod
     def do_extract(self):
@@ -0,0 +1,214 @@
+import os
+import queue
+import sqlite3
+import threading
+
+import pyarrow as pa
+from pyarrow import (
+    RecordBatch,
+    Table
+)
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import (
+    Iterator,
+    Literal
+)
+
+from .base import BaseExtractor
+
+from ..budget import BUDGET
+from ..cache import (
+    derive_fingerprint,
+    fingerprint_files
+)
+from ..engines import EngineManager
+
+duckdb = EngineManager.get_engine('duckdb')
+
+_DONE = object()
+
+
+class DatabaseExtractor(BaseExtractor):
+    TYPE = 'DATABASE_EXTRACTOR'
+
+    def __init__(self, config_dict, transformer):
+        super().__init__(config_dict, transformer)
+        self.engine: Literal['duckdb', 'sqlite'] = config_dict.get('engine', 'duckdb')
+        self.path: str = config_dict['path']
+        self.table: str | None = config_dict.get('table', None)
+        self.query: str = config_dict.get('query', None) or f'SELECT * FROM "{self.table}"'
+        self.fetch_size: int = config_dict.get('fetch_size', 100_000)
+        self.streaming: bool = config_dict.get('streaming', True)
+        self.partition_column: str | None = config_dict.get('partition_column', None)
+        self.partitions: int = config_dict.get('partitions', 1) if self.partition_column is not None else 1
+        self.max_workers: int = config_dict.get('max_workers', self.partitions)
+        self.queue_size: int = config_dict.get('queue_size', 2 * self.max_workers)
+
+        assert self.engine in ['duckdb', 'sqlite'], f'unknown database engine: [{self.engine}]'
+        assert self.table is not None or config_dict.get('query', None) is not None, "'table' or 'query' is required"
+
+    def _connect(self):
+        # read only, every partition reads through its own connection
+        if self.engine == 'duckdb':
+            return duckdb.connect(self.path, read_only=True, config=BUDGET.duckdb_config())
+
+        return sqlite3.connect(f'file:{self.path}?mode=ro', uri=True)
+
+    def _key_range(self) -> tuple:
+        conn = self._connect()
+
+        try:
+            column = f'"{self.partition_column}"'
+            return conn.execute(f'SELECT min({column}), max({column}) FROM ({self.query}) AS q').fetchone()
+        finally:
+            conn.close()
+
+    def _partition_queries(self) -> list[str]:
+        if self.partitions <= 1:
+            return [self.query]
+
+        low, high = self._key_range()
+
+        if low is None:
+            return [self.query]
+
+        column = f'"{self.partition_column}"'
+        integer = isinstance(low, int) and isinstance(high, int)
+        step = (high - low) / self.partitions
+        bounds = [low + (i * (high - low)) // self.partitions if integer else low + i * step
+                  for i in range(self.partitions)] + [high]
+
+        queries = []
+
+        for i in range(self.partitions):
+            last = i == self.partitions - 1
+            condition = f'{column} >= {bounds[i]} AND {column} {"<=" if last else "<"} {bounds[i + 1]}'
+
+            if i == 0:
+                # rows without a key still belong to exactly one partition
+                condition = f'({condition}) OR {column} IS NULL'
+
+            queries.append(f'SELECT * FROM ({self.query}) AS q WHERE {condition}')
+
+        self.logger.info(f"split query on 'partition_column' = {self.partition_column} "
+                         f"into {self.partitions} range(s) of [{low}, {high}]")
+
+        return queries
+
+    def __fetch_duckdb(self, conn, query: str) -> Iterator[RecordBatch]:
+        reader = conn.execute(query).fetch_record_batch(self.fetch_size)
+        yield from reader
+
+    def __fetch_sqlite(self, conn, query: str) -> Iterator[RecordBatch]:
+        cursor = conn.execute(query)
+        names = [column[0] for column in cursor.description]
+        schema = None
+
+        while True:
+            rows = cursor.fetchmany(self.fetch_size)
+
+            if not bool(rows):
+                break
+
+            columns = list(zip(*rows))
+
+            if schema is None:
+                batch = RecordBatch.from_arrays([pa.array(column) for column in columns], names=names)
+                # pin the inferred types of the first batch so every batch shares one schema
+                schema = batch.schema
+            else:
+                batch = RecordBatch.from_arrays(
+                    [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+                    schema=schema
+                )
+
+            yield batch
+
+    def _fetch(self, query: str) -> Iterator[RecordBatch]:
+        conn = self._connect()
+
+        try:
+            if self.engine == 'duckdb':
+                yield from self.__fetch_duckdb(conn, query)
+            else:
+                yield from self.__fetch_sqlite(conn, query)
+        finally:
+            conn.close()
+
+    def _stream(self) -> Iterator[RecordBatch]:
+        queries = self._partition_queries()
+
+        if len(queries) == 1 or self.max_workers <= 1:
+            for query in queries:
+                yield from self._fetch(query)
+            return
+
+        self.logger.info(f'read {len(queries)} partition(s) with {self.max_workers} worker(s)')
+
+        # at most 'queue_size' batches are fetched ahead of the consumer, batches of partitions interleave
+        batches = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+
+        def put(item) -> bool:
+            while not stop.is_set():
+                try:
+                    batches.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+
+            return False
+
+        def fetch_partition(query: str):
+            try:
+                for batch in self._fetch(query):
+                    if not put(batch):
+                        return
+            except Exception as e:
+                put(e)
+            finally:
+                put(_DONE)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            for query in queries:
+                pool.submit(fetch_partition, query)
+
+            try:
+                remaining = len(queries)
+
+                while remaining > 0:
+                    item = batches.get()
+
+                    if item is _DONE:
+                        remaining -= 1
+                    elif isinstance(item, Exception):
+                        raise item
+                    else:
+                        yield item
+            finally:
+                stop.set()
+
+    def do_extract(self):
+        self.logger.info(f"extract from [{self.path}] using 'engine' = {self.engine}")
+
+        if self.streaming:
+            self.call_transformer(self.metrics.count_output(self._stream()))
+            self.is_transformed = True
+            return None
+
+        batches = list(self._stream())
+
+        if not bool(batches):
+            return None
+
+        stat = os.stat(self.path)
+        self.fingerprint = derive_fingerprint(
+            fingerprint_files([{'name': os.path.abspath(self.path), 'size': stat.st_size, 'mtime': stat.st_mtime}]),
+            {'query': self.query}
+        )
+
+        return Table.from_batches(batches)
+
+
+__all__ = ['DatabaseExtractor']
@@ -1,24 +1,85 @@
 import os
+import json
+import hashlib
+import itertools
+from collections import deque
+from concurrent.futures import (
+    ProcessPoolExecutor,
+    ThreadPoolExecutor
+)
+from contextlib import contextmanager
+from functools import partial
+from multiprocessing import get_context
+from time import (
+    monotonic,
+    perf_counter_ns
+)
 
-import duckdb
 import pyarrow as pa
 import pyarrow.csv as pc
-import pandas as pd
-import polars as pl
-import pyarrow.dataset as ds
-from pyarrow import Table
-
-from fsspec.implementations.local import LocalFileSystem
+from pyarrow import (
+    RecordBatch,
+    Table
+)
+
+from fsspec.implementations.local import (
+    LocalFileSystem,
+    make_path_posix
+)
 from fsspec import AbstractFileSystem
-from typing import Literal
+from typing import (
+    Callable,
+    Iterator,
+    Literal
+)
 
 from .base import BaseExtractor
 
-from ...schemas import FileFilterParams
+from ..scans import FileScan
+from ..budget import BUDGET
+from ..cache import (
+    derive_fingerprint,
+    fingerprint_files
+)
+from ..column_types import (
+    complete_schema,
+    duckdb_columns,
+    pandas_dtypes,
+    parse_schema,
+    polars_schema,
+    schema_to_dict
+)
+from ..checkpoints import (
+    Checkpoint,
+    checkpoint_scope
+)
+from ..frames import (
+    Frame,
+    concat
+)
+from ..engines import EngineManager
+from ..housekeeping import HousekeepingLedger
+from ...schemas import (
+    CoalesceParams,
+    FileFilterParams
+)
+
+ds = EngineManager.get_engine('arrow_ds')
+pd = EngineManager.get_engine('pandas')
+pl = EngineManager.get_engine('polars')
+pq = EngineManager.get_engine('parquet')
 
 
 class FileExtractor(BaseExtractor):
     TYPE = 'FILE_EXTRACTOR'
+    FILE_EXT: str = None
+    # compressed variants of FILE_EXT the extractor reads, by extension
+    COMPRESSIONS: dict = {}
+    # config that only changes how files are listed, scheduled or tracked, never the extracted rows
+    SIGNATURE_IGNORE: set = {
+        'name', 'reprocess', 'fail_no_files', 'housekeeping', 'listing_cache', 'use_watermark', 'max_workers',
+        'executor', 'queue_size', 'checkpoint_batches', 'schema_key', 'profile', 'profile_dir', 'memory_pool_stats'
+    }
     __HK_FILE = 'etl.housekeeping'
 
     def __init__(self, config_dict, transformer):
@@ -28,37 +89,74 @@ class FileExtractor(BaseExtractor):
         self.hk_file = self.config_dict.get('housekeeping', self.__HK_FILE)
         self.reprocess = self.config_dict.get('reprocess', False)
         self.fail_no_files = self.config_dict.get('fail_no_files', False)
-        self.use_package: Literal['arrow', 'arrow_ds', 'pandas', 'polars', 'duckdb'] = self.config_dict['use_package']
+        self.use_package: Literal['arrow', 'arrow_ds', 'pandas', 'polars', 'duckdb'] = self.config_dict.get('use_package', 'arrow')
         self.filters = self.config_dict.get('filters', {})
+        self.file_filters = FileFilterParams.model_validate({} if self.filters is None else self.filters)
+        self.listing_cache: bool = self.config_dict.get('listing_cache', False)
+        self.use_watermark: bool = self.config_dict.get('use_watermark', False)
+        self.read_mode: Literal['single', 'all'] = config_dict.get('read_mode', 'single')
+        self.streaming: bool = config_dict.get('streaming', False)
+        self.max_workers: int = self.config_dict.get('max_workers', 1)
+        self.executor: Literal['thread', 'process'] = self.config_dict.get('executor', 'thread')
+        self.queue_size: int = self.config_dict.get('queue_size', 2 * self.max_workers)
+        self.checkpoint_batches: int | None = self.config_dict.get('checkpoint_batches', None)
+        coalesce = self.config_dict.get('coalesce', None)
+        self.coalesce: CoalesceParams | None = None if coalesce is None else CoalesceParams.model_validate(coalesce)
+        self.pushdown = False
+        self.pushdown_over_budget = False
+        # explicit column types of every file, None lets the engine infer them per read
+        self.schema: pa.Schema | None = None
+        self._ledger: HousekeepingLedger | None = None
+        self._run: tuple | None = None
+        self._file_info: dict[str, dict] = {}
+
+    def _file_ext(self, file: str) -> str:
+        exts = file.split('/')[-1].split('.')
+
+        # x.csv.gz is a csv file
+        if len(exts) > 2 and exts[-1] in self.COMPRESSIONS:
+            return exts[-2]
+
+        return exts[-1]
+
+    def _compression(self, file: str) -> str | None:
+        return self.COMPRESSIONS.get(file.split('.')[-1])
 
     def _filter_files(self, files: list, file_ext: str):
-        filters = {} if self.filters is None else self.filters
-        filters = FileFilterParams.model_validate(filters)
+        filters = self.file_filters
 
         self.logger.info(f"filter 'file_ext': {file_ext}")
-        files = [file for file in files if file.split('.')[-1] == file_ext]
+        files = [file for file in files if self._file_ext(file) == file_ext]
         self.logger.info(f"keep {len(files)} file(s) with 'file_ext': {file_ext}")
 
+        if filters.pattern is not None:
+            self.logger.info(f"filter 'pattern': {filters.pattern}")
+
+            root = make_path_posix(self.path).rstrip('/') + '/'
+            files = [file for file in files if filters.match_pattern(file.removeprefix(root))]
+
+            self.logger.info(f"keep {len(files)} file(s) with 'pattern': {filters.pattern}")
+
+        keys = {file: file.split('/')[-1].split('.')[0] for file in files}
+
         if filters.key is not None and filters.key.strip() != '':
             self.logger.info("ignore filter options 'include' and 'exclude'")
             self.logger.info(f"filter 'key': {filters.key}")
 
-            files = [file for file in files if file.split('/')[-1].split('.')[0] == filters.key]
+            files = [file for file in files if keys[file] == filters.key]
             self.logger.info(f"keep {len(files)} file(s) with 'key': {filters.key}")
         else:
             if bool(filters.include):
                 self.logger.info(f"filter 'include': {filters.include}")
 
-                files = [file for file in files for key in filters.include
-                         if key in file.split('/')[-1].split('.')[0]]
+                files = [file for file in files if filters.match_include(keys[file])]
 
                 self.logger.info(f"keep {len(files)} file(s) with 'include': {filters.include}")
 
             if bool(filters.exclude):
                 self.logger.info(f"filter 'exclude': {filters.exclude}")
 
-                files = [file for file in files for key in filters.exclude
-                         if key not in file.split('/')[-1].split('.')[0]]
+                files = [file for file in files if filters.match_exclude(keys[file])]
 
                 self.logger.info(f"keep {len(files)} file(s) with 'exclude': {filters.exclude}")
 
@@ -76,6 +174,87 @@ class FileExtractor(BaseExtractor):
 
         return files
 
+    def _map_files(self, fn: Callable, files: list[str]) -> Iterator:
+        if self.max_workers <= 1 or len(files) == 1:
+            for file in files:
+                yield fn(file)
+            return
+
+        # forked workers inherit the locks of the polars/duckdb/arrow thread pools and can hang on them
+        executors: dict = {
+            'thread': ThreadPoolExecutor,
+            'process': partial(ProcessPoolExecutor, mp_context=get_context('spawn'))
+        }
+
+        self.logger.info(f"read {len(files)} file(s) using 'executor' = {self.executor} "
+                         f"with {self.max_workers} worker(s)")
+
+        queue_size = self._queue_size(files)
+
+        # at most 'queue_size' files are parsed ahead of the consumer, results keep the file order
+        with executors[self.executor](max_workers=self.max_workers) as pool:
+            pending = deque()
+            queued_files = iter(files)
+
+            for file in queued_files:
+                pending.append(pool.submit(fn, file))
+
+                if len(pending) >= queue_size:
+                    break
+
+            while pending:
+                result = pending.popleft().result()
+                file = next(queued_files, None)
+
+                if file is not None:
+                    pending.append(pool.submit(fn, file))
+
+                yield result
+
+    def _file_sizes(self, files: list[str]) -> list[int]:
+        return [self._file_info.get(file, {}).get('size') or 0 for file in files]
+
+    def _queue_size(self, files: list[str]) -> int:
+        buffer_bytes = BUDGET.buffer_bytes()
+
+        if buffer_bytes is None:
+            return self.queue_size
+
+        # parsed files waiting for the consumer must fit the buffer budget together
+        largest = max(1, max(self._file_sizes(files)))
+        return max(1, min(self.queue_size, buffer_bytes // largest))
+
+    def _exceeds_budget(self, files: list[str]) -> bool:
+        buffer_bytes = BUDGET.buffer_bytes()
+
+        # pushed down scans are bounded by the query engine itself
+        if buffer_bytes is None or self.pushdown:
+            return False
+
+        sizes = self._file_sizes(files)
+        in_memory = sum(sizes) if self.read_mode == 'all' else max(sizes)
+
+        if in_memory <= buffer_bytes:
+            return False
+
+        fallback = 'scan the files with the query engine' if self.pushdown_over_budget else 'stream record batches'
+        self.logger.warning(f'{in_memory} byte(s) of input exceed the memory buffer of {buffer_bytes} byte(s), '
+                            f'{fallback} instead')
+        return True
+
+    def signature(self) -> dict:
+        # what the extractor does to its files, the resolved schema stands in for 'schema: auto'
+        config = {key: value for key, value in self.config_dict.items() if key not in self.SIGNATURE_IGNORE}
+
+        return {'type': self.TYPE, 'config': config, 'schema': None if self.schema is None else str(self.schema),
+                'pushdown': self.pushdown, 'pushdown_over_budget': self.pushdown_over_budget}
+
+    def _fingerprint(self, files: list[str]) -> str:
+        return derive_fingerprint(
+            fingerprint_files([self._file_info.get(file) or {'name': file} for file in files]),
+            self.signature()
+        )
+
     def _get_hk_data(self, fs: AbstractFileSystem) -> list:
         processed_files = []
         hk_file_path = os.path.join(self.path, self.hk_file)
@@ -91,27 +270,193 @@ class FileExtractor(BaseExtractor):
 
         return processed_files
 
-    def _update_hf_file(self, fs: AbstractFileSystem, files: list[str]):
-        hk_file_path = os.path.join(self.path, self.hk_file)
+    @property
+    def hk_dir(self) -> str:
+        # ledger and manifest writes stay out of the landing directory, its mtime only changes with new files
+        return os.path.join(self.path, f'.{self.hk_file}')
 
-        hk_files = self._get_hk_data(fs)
-        files = [file.split('/')[-1] for file in files]
+    def _move_legacy_ledger(self, db_path: str):
+        legacy_path = os.path.join(self.path, f'{self.hk_file}.db')
 
-        hk_data = set(hk_files).union(set(files))
-        hk_data = '\n'.join(hk_data) + '\n'
+        if not os.path.exists(legacy_path) or os.path.exists(db_path):
+            return
 
-        fs.write_text(
-            path=hk_file_path,
-            value=hk_data,
-            encoding='utf-8'
-        )
+        os.makedirs(self.hk_dir, exist_ok=True)
+
+        for suffix in ['', '-wal', '-shm']:
+            if os.path.exists(f'{legacy_path}{suffix}'):
+                os.replace(f'{legacy_path}{suffix}', f'{db_path}{suffix}')
+
+        self.logger.info(f'moved housekeeping ledger [{legacy_path}] to [{db_path}]')
+
+    @property
+    def ledger(self) -> HousekeepingLedger:
+        if self._ledger is None:
+            fs = LocalFileSystem(auto_mkdir=True)
+            db_path = os.path.join(self.hk_dir, f'{self.hk_file}.db')
+
+            self._move_legacy_ledger(db_path)
+            self._ledger = HousekeepingLedger(db_path, name=self.name)
+
+            if self._ledger.is_empty():
+                legacy_files = self._get_hk_data(fs)
+
+                if bool(legacy_files):
+                    self._ledger.import_legacy(legacy_files)
+
+        return self._ledger
+
+    def _hk_name(self, file: str) -> str:
+        # relative to the landing path, plain file names for non-recursive listings
+        root = make_path_posix(self.path).rstrip('/') + '/'
+        return file.removeprefix(root) if file.startswith(root) else file.split('/')[-1]
+
+    def _hk_entries(self, fs: AbstractFileSystem, files: list[str]) -> list[dict]:
+        entries = []
+
+        for file in files:
+            info = self._file_info.get(file) or fs.info(file)
+
+            entries.append({
+                'name': self._hk_name(file),
+                'size': info.get('size'),
+                'mtime': info.get('mtime')
+            })
+
+        return entries
+
+    def _item_name(self, files: list[str]) -> str:
+        if len(files) == 1:
+            return self._hk_name(files[0])
+
+        names = '\n'.join(sorted(self._hk_name(file) for file in files))
+        return f'{len(files)} files {hashlib.sha1(names.encode("utf-8")).hexdigest()[:12]}'
+
+    def _write_manifest(self, run_id: int):
+        manifest_path = os.path.join(self.hk_dir, f'{self.hk_file}.manifest.json')
+        tmp_path = f'{manifest_path}.tmp'
+
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.ledger.manifest(run_id), f, indent=2)
+
+        os.replace(tmp_path, manifest_path)
+
+    @contextmanager
+    def _checkpointed_run(self, items: list[list[str]]):
+        # an item (a file, or every file in 'read_mode' = all) is committed right after it is stored,
+        # a failed run is resumed by the next run of the same extractor and skips its committed items
+        run_id, attempt_started, resumed = self.ledger.begin_run(self.name)
+        committed = self.ledger.committed_files(run_id) if resumed else set()
+
+        if resumed:
+            self.logger.info(f'resume run {run_id} at {attempt_started.isoformat()}, '
+                             f'{len(committed)} file(s) already committed')
+
+        self._run = (run_id, attempt_started, resumed and self.ledger.has_items(run_id))
+        pending = [files for files in items if not all(self._hk_name(file) in committed for file in files)]
+
+        if len(pending) < len(items):
+            self.logger.info(f'skip {len(items) - len(pending)} item(s) committed by run {run_id}')
+
+        status = 'failed'
+
+        try:
+            yield pending
+            status = 'completed'
+        finally:
+            self.ledger.finish_run(run_id, status)
+            self._write_manifest(run_id)
+            self.logger.info(f'run {run_id} {status}')
+
+    def _commit_item(self, fs: AbstractFileSystem, files: list[str], process: Callable[[Checkpoint], None]):
+        run_id, attempt_started, resumed = self._run
+        item = self._item_name(files)
+        checkpoint = Checkpoint(self.ledger, run_id, attempt_started, item, self.checkpoint_batches, resumed)
+
+        with checkpoint_scope(checkpoint):
+            process(checkpoint)
+
+        self.ledger.commit_item(run_id, item, self._hk_entries(fs, files))
+        self.logger.info(f'committed [{item}] with {len(files)} file(s) to housekeeping')
+
+    def _is_processed(self, file: str, processed: dict[str, tuple]) -> bool:
+        entry = processed.get(self._hk_name(file))
+
+        if entry is None:
+            return False
+
+        size, mtime = entry
+        info = self._file_info.get(file, {})
+
+        # legacy entries carry no size/mtime and are trusted by name only
+        if size is None or mtime is None:
+            return True
+
+        return size == info.get('size') and mtime == info.get('mtime')
+
+    def _scan_dir(self, dir_path: str) -> list[dict]:
+        # reuse the cached entries of an unchanged directory, a changed one is listed and stat'ed again;
+        # the ledger is opened first, creating it must not change the mtime compared below
+        ledger = self.ledger
+        dir_mtime = os.stat(dir_path).st_mtime
+        cached_mtime, cached_entries = ledger.cached_listing(dir_path)
+
+        if cached_mtime == dir_mtime:
+            return cached_entries
+
+        hk_dir = make_path_posix(self.hk_dir)
+        entries = []
+
+        with os.scandir(dir_path) as it:
+            for entry in it:
+                path = make_path_posix(entry.path)
+
+                if path == hk_dir:
+                    continue
+
+                if entry.is_dir(follow_symlinks=False):
+                    entries.append({'name': path, 'type': 'directory'})
+                else:
+                    stat = entry.stat()
+                    entries.append({'name': path, 'type': 'file', 'size': stat.st_size, 'mtime': stat.st_mtime})
+
+        ledger.save_listing(dir_path, dir_mtime, entries)
+        return entries
+
+    def _cached_ls(self) -> list[dict]:
+        pending = [make_path_posix(self.path)]
+        files = []
+
+        while pending:
+            entries = self._scan_dir(pending.pop())
+            files.extend(entry for entry in entries if entry['type'] == 'file')
+
+            if self.file_filters.recursive:
+                pending.extend(entry['name'] for entry in entries if entry['type'] == 'directory')
+
+        return files
+
+    def _ls(self, fs: AbstractFileSystem) -> list[dict]:
+        if self.listing_cache and isinstance(fs, LocalFileSystem):
+            self.logger.info('list files using the cached directory index')
+            return self._cached_ls()
+
+        max_depth = None if self.file_filters.recursive else 1
+        return list(fs.find(self.path, maxdepth=max_depth, detail=True).values())
 
     def _list_files(self, fs: AbstractFileSystem, file_ext: str):
-        files = fs.ls(self.path, detail=True)
+        files = self._ls(fs)
         files = sorted(files, key=lambda x: x['mtime'], reverse=True)
 
         # ignore directories and .housekeeping files
-        files = [file['name'] for file in files if file['type'] == 'file' and file['name'] != self.hk_file]
+        hk_dir = make_path_posix(self.hk_dir) + '/'
+        files = [
+            file for file in files
+            if file['type'] == 'file' and file['name'] != self.hk_file and not file['name'].startswith(hk_dir)
+        ]
+        self._file_info = {file['name']: file for file in files}
+
+        files = [file['name'] for file in files]
         self.logger.info(f'retrieved {len(files)} file(s) from {self.path}')
 
         files = self._filter_files(files, file_ext)
@@ -120,10 +465,15 @@ class FileExtractor(BaseExtractor):
             self.logger.info(f'ignore {self.hk_file} file')
             self.logger.info(f'(re)-extracting all {len(files)} file(s) from {self.path}')
         else:
-            processed_files = self._get_hk_data(fs)
-            processed_files = [os.path.join(self.path, file) for file in processed_files]
+            watermark = self.ledger.get_watermark() if self.use_watermark else None
+
+            if watermark is not None:
+                files = [file for file in files if self._file_info[file]['mtime'] > watermark]
+                self.logger.info(f'keep {len(files)} file(s) newer than the mtime watermark {watermark}')
+
+            processed = self.ledger.lookup([self._hk_name(file) for file in files])
 
-            files = list(set(files) - set(processed_files))
+            files = [file for file in files if not self._is_processed(file, processed)]
             self.logger.info(f'extract {len(files)} file(s) after housekeeping')
 
         if not bool(files) and self.fail_no_files:
@@ -131,15 +481,224 @@ class FileExtractor(BaseExtractor):
 
         return files
 
+    def _read(self, fs: AbstractFileSystem, source: str | list[str]) -> Table:
+        raise NotImplementedError()
+
+    def _stream(self, fs: AbstractFileSystem, source: str | list[str]) -> Iterator[RecordBatch]:
+        raise NotImplementedError()
+
+    def _file_reader(self, fs: AbstractFileSystem) -> Callable[[str], Table]:
+        if self.executor == 'process' and self.max_workers > 1:
+            return partial(_read_file_worker, type(self), self.config_dict)
+
+        return partial(self._read, fs)
+
+    def _resolve_schema(self, files: list[str]):
+        pass
+
+    def _items(self, files: list[str]) -> list[list[str]]:
+        if self.read_mode == 'all' or len(files) == 1:
+            return [files]
+
+        return [[file] for file in files]
+
+    @staticmethod
+    def _source(item: list[str]) -> str | list[str]:
+        return item[0] if len(item) == 1 else item
+
+    def _resume_stream(self, batches: Iterator[RecordBatch], checkpoint: Checkpoint) -> Iterator[RecordBatch]:
+        if checkpoint.skip_batches == 0 or checkpoint.every_batches is None:
+            return batches
+
+        # batches up to the last checkpoint are already stored
+        self.logger.info(f'resume [{checkpoint.item}] after {checkpoint.skip_batches} stored batch(es)')
+        return itertools.islice(batches, checkpoint.skip_batches, None)
+
+    def _do_stream(self, fs: AbstractFileSystem, items: list[list[str]]):
+        for item in items:
+            self._commit_item(fs, item, lambda checkpoint: self.call_transformer(
+                self.metrics.count_output(self._resume_stream(self._stream(fs, self._source(item)), checkpoint))
+            ))
+
+    def _do_pushdown(self, fs: AbstractFileSystem, items: list[list[str]]):
+        # set by the pushdown planner, the query transformer reads the files itself
+        for item in items:
+            self._commit_item(fs, item, lambda checkpoint: self.call_transformer(
+                FileScan(item, file_format=self.FILE_EXT, schema=self.schema), self._fingerprint(item)
+            ))
+
+    def _batch_full(self, num_rows: int, num_bytes: int, started: float) -> bool:
+        params = self.coalesce
+        target_bytes = [size for size in [params.target_bytes, BUDGET.buffer_bytes()] if size is not None]
+
+        if params.target_rows is not None and num_rows >= params.target_rows:
+            return True
+
+        if bool(target_bytes) and num_bytes >= min(target_bytes):
+            return True
+
+        return params.max_wait is not None and monotonic() - started >= params.max_wait
+
+    def _do_coalesce(self, fs: AbstractFileSystem, results: Iterator[tuple[str, tuple]]):
+        # small files are concatenated into one batch, one transform and store per batch instead of per file
+        files, datasets = [], []
+        num_rows, num_bytes, started = 0, 0, monotonic()
+
+        def flush():
+            self.logger.info(f'coalesced {len(files)} file(s) into a batch of {num_rows} row(s)')
+            self._commit_item(fs, files, lambda checkpoint: self.call_transformer(
+                self.metrics.count_output(concat(datasets)), self._fingerprint(files)
+            ))
+
+        for file, (dataset, wall_ns) in results:
+            self.metrics.record_file(file, dataset, wall_ns)
+
+            if not bool(files):
+                started = monotonic()
+
+            files.append(file)
+            datasets.append(dataset)
+            num_rows += dataset.num_rows
+            num_bytes += dataset.nbytes
+
+            if self._batch_full(num_rows, num_bytes, started):
+                flush()
+                files, datasets = [], []
+                num_rows, num_bytes = 0, 0
+
+        if bool(files):
+            flush()
+
+    def _do_read_all(self, fs: AbstractFileSystem, reader: Callable, files: list[str]) -> Table | Frame:
+        if self.max_workers > 1 and len(files) > 1:
+            datasets = []
+
+            for file, (dataset, wall_ns) in zip(files, self._map_files(reader, files)):
+                self.metrics.record_file(file, dataset, wall_ns)
+                datasets.append(dataset)
+
+            return concat(datasets)
+
+        return self._read(fs, files)
+
+    def do_extract(self):
+        if self.storage_backend == 'fs':
+            self.logger.info(f"extract files using 'storage_backend' = [{self.storage_backend}]")
+
+            fs = LocalFileSystem(auto_mkdir=True)
+            files = self._list_files(fs, file_ext=self.FILE_EXT)
+
+            if not bool(files):
+                return None
+
+            self._resolve_schema(files)
+
+            over_budget = not self.streaming and self._exceeds_budget(files)
+
+            with self._checkpointed_run(self._items(files)) as items:
+                if self.streaming or (over_budget and not self.pushdown_over_budget):
+                    self._do_stream(fs, items)
+                elif self.pushdown or over_budget:
+                    self._do_pushdown(fs, items)
+                else:
+                    reader = partial(_timed_read, self._file_reader(fs))
+
+                    if self.read_mode == 'all' or len(files) == 1:
+                        for item in items:
+                            self._commit_item(fs, item, lambda checkpoint: self.call_transformer(
+                                self.metrics.count_output(self._do_read_all(fs, reader, item)),
+                                self._fingerprint(item)
+                            ))
+                    else:
+                        pending = [item[0] for item in items]
+                        results = zip(pending, self._map_files(reader, pending))
+
+                        if self.coalesce is not None:
+                            self._do_coalesce(fs, results)
+                        else:
+                            for file, (dataset, wall_ns) in results:
+                                self.metrics.record_file(file, dataset, wall_ns)
+                                self._commit_item(fs, [file], lambda checkpoint: self.call_transformer(
+                                    self.metrics.count_output(dataset), self._fingerprint([file])
+                                ))
+
+            self.is_transformed = True
+            return None
+        else:
+            raise NotImplementedError()
+
 
 class CsvFileExtractor(FileExtractor):
     TYPE = 'CSV_FILE_EXTRACTOR'
+    FILE_EXT = 'csv'
+    COMPRESSIONS = {
+        'gz': 'gzip',
+        'zst': 'zstd'
+    }
 
     def __init__(self, config_dict, transformer):
         super().__init__(config_dict, transformer)
-        self.read_mode: Literal['single', 'all'] = config_dict.get('read_mode', 'single')
+        self.block_size: int | None = config_dict.get('block_size', None)
+        schema = config_dict.get('schema', None)
+        # 'auto' infers the schema once per 'schema_key' and caches it in the housekeeping ledger
+        self.auto_schema: bool = schema == 'auto'
+        self.schema_key: str = config_dict.get('schema_key', None) or self.file_filters.key or self.name
+
+        if isinstance(schema, pa.Schema):
+            # resolved by the parent process of a process pool worker
+            self.schema = schema
+        elif isinstance(schema, dict):
+            self.schema = parse_schema(schema)
+
+    def _resolve_schema(self, files: list[str]):
+        if not self.auto_schema or self.schema is not None:
+            return
+
+        state_key = f'schema:{self.schema_key}'
+        cached = self.ledger.get_state(state_key)
+
+        if cached is not None:
+            self.schema = parse_schema(json.loads(cached))
+            self.logger.info(f"use cached schema of 'schema_key' = {self.schema_key}")
+            return
+
+        # one inference for the dataset, from the first block of its latest file
+        with pc.open_csv(self._input(files[0]), read_options=self.__read_options()) as reader:
+            self.schema = complete_schema(reader.schema)
+
+        self.ledger.save_state(state_key, json.dumps(schema_to_dict(self.schema)))
+        self.logger.info(f"inferred schema of 'schema_key' = {self.schema_key} from [{files[0]}]: "
+                         f"{schema_to_dict(self.schema)}")
+
+    def _file_reader(self, fs: AbstractFileSystem) -> Callable[[str], Table]:
+        if self.executor == 'process' and self.max_workers > 1 and self.schema is not None:
+            return partial(_read_file_worker, type(self), {**self.config_dict, 'schema': self.schema})
+
+        return super()._file_reader(fs)
+
+    def _input(self, file: str) -> str | pa.NativeFile:
+        compression = self._compression(file)
 
-    def _read_csv(self, fs: AbstractFileSystem, source: str | list[str]) -> Table:
+        # engines read plain files from the path best themselves
+        if compression is None:
+            return file
+
+        # decompressed while it is read, the file is never expanded on disk
+        return pa.input_stream(file, compression=compression, buffer_size=self.block_size or 1 << 20)
+
+    def _arrow_ds(self, source: str | list[str]) -> bool:
+        if self.storage_backend != 'fs':
+            return True
+
+        sources = source if isinstance(source, list) else [source]
+
+        # datasets only detect gzip by extension, compressed files go through the input streams
+        return self.use_package == 'arrow_ds' and all(self._compression(file) is None for file in sources)
+
+    def __convert_options(self) -> pc.ConvertOptions:
+        return pc.ConvertOptions() if self.schema is None else pc.ConvertOptions(column_types=self.schema)
+
+    def _read(self, fs: AbstractFileSystem, source: str | list[str]) -> Table | Frame:
         self.logger.info(f"extract files using 'package' = {self.use_package}")
 
         package_mgr: dict = {
@@ -149,72 +708,186 @@ class CsvFileExtractor(FileExtractor):
             'duckdb': self.__use_duckdb
         }
 
-        if self.storage_backend != 'fs' or self.use_package == 'arrow_ds':
+        if self._arrow_ds(source):
             return self.__use_arrow_dataset(fs, source)
         else:
-            fs_reader = package_mgr[self.use_package]
+            fs_reader = package_mgr.get(self.use_package, self.__use_arrow)
             return fs_reader(source)
 
     def __use_arrow_dataset(self, fs: AbstractFileSystem, source: str | list[str]):
+        # the configured types override the inferred ones, a schema is no projection
         return ds.dataset(
             source=source,
-            format='csv',
+            format=ds.CsvFileFormat(convert_options=self.__convert_options()),
             exclude_invalid_files=True,
             filesystem=fs
         ).to_table()
 
     def __use_arrow(self, source: str | list[str]) -> Table:
+        convert_options = self.__convert_options()
+
         if isinstance(source, list):
-            dfs = [pc.read_csv(file) for file in source]
+            dfs = [pc.read_csv(self._input(file), convert_options=convert_options) for file in source]
             df = pa.concat_tables(dfs)
         else:
-            df = pc.read_csv()
+            df = pc.read_csv(self._input(source), convert_options=convert_options)
 
         return df
 
-    def __use_pandas(self, source: str | list[str]) -> Table:
+    def __use_pandas(self, source: str | list[str]) -> Frame:
+        dtype = None if self.schema is None else pandas_dtypes(self.schema)
+
+        # arrow backed columns in any case, the frame converts to arrow without a copy
         if isinstance(source, list):
-            dfs = [pd.read_csv(file) for file in source]
+            dfs = [pd.read_csv(self._input(file), dtype=dtype, dtype_backend='pyarrow') for file in source]
             df = pd.concat(dfs, ignore_index=True)
         else:
-            df = pd.read_csv(source)
+            df = pd.read_csv(self._input(source), dtype=dtype, dtype_backend='pyarrow')
+
+        # stays a pandas frame until a stage asks for another engine
+        return Frame(df, 'pandas')
 
-        return pa.Table.from_pandas(df)
+    def __use_polars(self, source: str | list[str]) -> Frame:
+        # bound to the header by name, like the arrow and pandas readers
+        schema_overrides = None if self.schema is None else polars_schema(self.schema)
 
-    def __use_polars(self, source: str | list[str]) -> Table:
         if isinstance(source, list):
-            dfs = [pl.read_csv(file) for file in source]
+            dfs = [pl.read_csv(self._input(file), schema_overrides=schema_overrides) for file in source]
             df = pl.concat(dfs)
         else:
-            df = pl.read_csv(source)
+            df = pl.read_csv(self._input(source), schema_overrides=schema_overrides)
 
-        return df.to_arrow()
+        return Frame(df, 'polars')
 
     def __use_duckdb(self, source: str | list[str]) -> Table:
-        df = duckdb.sql(f'select * from read_csv({source})')
+        # duckdb detects gzip and zstd files by extension and decompresses them itself
+        sources = source if isinstance(source, list) else [source]
+        # extract threads and concurrent branches must not share a connection
+        conn = BUDGET.duckdb_cursor()
+        options = BUDGET.duckdb_csv_options()
+
+        if self.schema is not None:
+            # 'types' binds by column name, the header and the other columns are still detected
+            types = duckdb_columns(self.schema)
+            df = conn.sql(f'select * from read_csv({sources}, types={types}, header=true{options})')
+        else:
+            df = conn.sql(f'select * from read_csv({sources}{options})')
+
         return df.arrow()
 
-    def do_extract(self):
-        if self.storage_backend == 'fs':
-            self.logger.info(f"extract files using 'storage_backend' = [{self.storage_backend}]")
+    def _stream(self, fs: AbstractFileSystem, source: str | list[str]) -> Iterator[RecordBatch]:
+        self.logger.info(f"stream files using 'package' = {self.use_package}")
 
-            fs = LocalFileSystem(auto_mkdir=True)
-            files = self._list_files(fs, file_ext='csv')
+        if self._arrow_ds(source):
+            return self.__stream_arrow_dataset(fs, source)
 
-            if not bool(files):
-                return None
+        if self.use_package not in ['arrow', 'arrow_ds']:
+            self.logger.warning(f"streaming is only supported by 'package' = arrow, ignore {self.use_package}")
 
-            if self.read_mode == 'all' or len(files) == 1:
-                dataset = self._read_csv(fs, files)
-                self._update_hf_file(fs, files)
-                return dataset
-            else:
-                for file in files:
-                    dataset = self._read_csv(fs, file)
-                    self.call_transformer(dataset)
-
-                self._update_hf_file(fs, files)
-                self.is_transformed = True
-                return None
-        else:
-            raise NotImplementedError()
+        return self.__stream_arrow(source)
+
+    def __read_options(self) -> pc.ReadOptions:
+        read_options = pc.ReadOptions()
+
+        if self.block_size is not None:
+            read_options.block_size = self.block_size
+
+        return read_options
+
+    def __stream_arrow_dataset(self, fs: AbstractFileSystem, source: str | list[str]) -> Iterator[RecordBatch]:
+        dataset = ds.dataset(
+            source=source,
+            format=ds.CsvFileFormat(read_options=self.__read_options(), convert_options=self.__convert_options()),
+            exclude_invalid_files=True,
+            filesystem=fs
+        )
+
+        yield from dataset.to_batches()
+
+    def __stream_arrow(self, source: str | list[str]) -> Iterator[RecordBatch]:
+        sources = source if isinstance(source, list) else [source]
+        convert_options = self.__convert_options()
+
+        for file in sources:
+            with pc.open_csv(self._input(file), read_options=self.__read_options(),
+                             convert_options=convert_options) as reader:
+                # pin the inferred types of the first file so every batch shares one schema
+                convert_options = pc.ConvertOptions(column_types=reader.schema)
+                yield from reader
+
+
+class ArrowDatasetFileExtractor(FileExtractor):
+    TYPE = 'ARROW_DATASET_FILE_EXTRACTOR'
+    FORMAT: Literal['parquet', 'ipc', 'json'] = None
+
+    def __init__(self, config_dict, transformer):
+        super().__init__(config_dict, transformer)
+        self.columns: list[str] | None = config_dict.get('columns', None)
+        self.filter: list | None = config_dict.get('filter', None)
+        self.batch_size: int | None = config_dict.get('batch_size', None)
+
+    def _filter_expression(self) -> 'ds.Expression | None':
+        # 'filter' uses the disjunctive normal form of pyarrow.parquet filters:
+        # [[col, op, value], ...] is AND-ed, [[[...]], [[...]]] is OR-ed
+        if not bool(self.filter):
+            return None
+
+        return pq.filters_to_expression(self.filter)
+
+    def _scan_options(self) -> dict:
+        scan_options: dict = {
+            'columns': self.columns,
+            'filter': self._filter_expression()
+        }
+
+        if self.batch_size is not None:
+            scan_options['batch_size'] = self.batch_size
+
+        return scan_options
+
+    def _dataset(self, fs: AbstractFileSystem, source: str | list[str]) -> 'ds.Dataset':
+        self.logger.info(f"scan files using 'format' = {self.FORMAT}, 'columns' = {self.columns}, "
+                         f"'filter' = {self.filter}")
+
+        return ds.dataset(
+            source=source,
+            format=self.FORMAT,
+            exclude_invalid_files=True,
+            filesystem=fs
+        )
+
+    def _read(self, fs: AbstractFileSystem, source: str | list[str]) -> Table:
+        return self._dataset(fs, source).to_table(**self._scan_options())
+
+    def _stream(self, fs: AbstractFileSystem, source: str | list[str]) -> Iterator[RecordBatch]:
+        return self._dataset(fs, source).to_batches(**self._scan_options())
+
+
+class ParquetFileExtractor(ArrowDatasetFileExtractor):
+    TYPE = 'PARQUET_FILE_EXTRACTOR'
+    FORMAT = 'parquet'
+    FILE_EXT = 'parquet'
+
+
+class ArrowIpcFileExtractor(ArrowDatasetFileExtractor):
+    TYPE = 'ARROW_IPC_FILE_EXTRACTOR'
+    FORMAT = 'ipc'
+    FILE_EXT = 'arrow'
+
+
+class JsonLinesFileExtractor(ArrowDatasetFileExtractor):
+    TYPE = 'JSONL_FILE_EXTRACTOR'
+    FORMAT = 'json'
+    FILE_EXT = 'jsonl'
+
+
+def _timed_read(fn: Callable[[str], Table], file: str) -> tuple[Table, int]:
+    start_ns = perf_counter_ns()
+    data = fn(file)
+    return data, perf_counter_ns() - start_ns
+
+
+def _read_file_worker(extractor_cls: type[FileExtractor], config_dict: dict, source: str) -> Table:
+    # module level so it can be pickled into a ProcessPoolExecutor
+    extractor = extractor_cls(config_dict=config_dict, transformer=None)
+    return extractor._read(LocalFileSystem(auto_mkdir=True), source)
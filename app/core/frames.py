@@ -0,0 +1,144 @@
+import itertools
+
+import pyarrow as pa
+
+from collections.abc import Iterator
+from typing import Literal
+
+from .budget import BUDGET
+from .engines import EngineManager
+from .metrics import METRICS
+
+pd = EngineManager.get_engine('pandas')
+pl = EngineManager.get_engine('polars')
+
+FrameEngine = Literal['arrow', 'pandas', 'polars']
+
+
+class Frame(object):
+    # engine neutral handle, keeps the native object and converts only when a stage asks for another engine
+
+    def __init__(self, data, engine: FrameEngine | None = None) -> None:
+        self.engine: FrameEngine = self.detect_engine(data) if engine is None else engine
+        self.__views: dict = {self.engine: data}
+
+    @staticmethod
+    def detect_engine(data) -> FrameEngine:
+        if isinstance(data, (pa.Table, pa.RecordBatch)):
+            return 'arrow'
+
+        # compare module names, the engines are not imported just to check a type
+        package = type(data).__module__.split('.')[0]
+        assert package in ['pandas', 'polars'], f'unsupported frame type: [{type(data)}]'
+
+        return package
+
+    @classmethod
+    def wrap(cls, data) -> 'Frame':
+        return data if isinstance(data, Frame) else cls(data)
+
+    @classmethod
+    def concat(cls, frames: list['Frame']) -> 'Frame':
+        engines = {frame.engine for frame in frames}
+
+        if engines == {'polars'}:
+            return cls(pl.concat([frame.native for frame in frames]), 'polars')
+
+        if engines == {'pandas'}:
+            return cls(pd.concat([frame.native for frame in frames], ignore_index=True), 'pandas')
+
+        return cls(pa.concat_tables([frame.to_arrow() for frame in frames]), 'arrow')
+
+    @property
+    def native(self):
+        return self.__views[self.engine]
+
+    @property
+    def num_rows(self) -> int:
+        data = self.native
+
+        if self.engine == 'arrow':
+            return data.num_rows
+
+        return data.height if self.engine == 'polars' else len(data)
+
+    @property
+    def nbytes(self) -> int:
+        data = self.native
+
+        if self.engine == 'arrow':
+            return data.nbytes
+
+        return int(data.estimated_size()) if self.engine == 'polars' else int(data.memory_usage(deep=False).sum())
+
+    def __convert(self, engine: FrameEngine):
+        # zero-copy paths: arrow buffers are shared with polars and with pandas ArrowDtype columns
+        if engine == 'arrow':
+            if self.engine == 'polars':
+                return self.native.to_arrow()
+
+            return pa.Table.from_pandas(self.native, preserve_index=False)
+
+        if engine == 'polars':
+            if self.engine == 'pandas':
+                return pl.from_pandas(self.native)
+
+            return pl.from_arrow(self.native, rechunk=False)
+
+        if self.engine == 'polars':
+            return self.native.to_pandas(use_pyarrow_extension_array=True)
+
+        return self.native.to_pandas(types_mapper=pd.ArrowDtype)
+
+    def to(self, engine: FrameEngine):
+        if engine not in self.__views:
+            self.__views[engine] = self.__convert(engine)
+            METRICS.record_conversion(self.engine, engine, self.nbytes)
+
+        return self.__views[engine]
+
+    def to_arrow(self) -> pa.Table:
+        return self.to('arrow')
+
+    def to_duckdb(self):
+        # duckdb reads pandas frames in place and arrow through the C stream, polars exports its buffers to arrow
+        conn = BUDGET.duckdb_cursor()
+
+        if self.engine == 'pandas':
+            return conn.from_df(self.native)
+
+        return conn.from_arrow(self.to_arrow())
+
+    def __repr__(self) -> str:
+        return f'Frame(engine={self.engine}, views={list(self.__views)})'
+
+
+def to_arrow(data):
+    # unwrap a frame for arrow-only consumers, arrow tables and batches pass through
+    return data.to_arrow() if isinstance(data, Frame) else data
+
+
+def batch_reader(data: Iterator) -> pa.RecordBatchReader | None:
+    # one arrow stream over batches, tables or frames, None for an empty stream
+    batches = (
+        batch
+        for item in map(to_arrow, data)
+        for batch in (item.to_batches() if isinstance(item, pa.Table) else [item])
+    )
+
+    first = next(batches, None)
+
+    if first is None:
+        return None
+
+    return pa.RecordBatchReader.from_batches(first.schema, itertools.chain([first], batches))
+
+
+def concat(datasets: list):
+    if all(isinstance(dataset, pa.Table) for dataset in datasets):
+        return pa.concat_tables(datasets)
+
+    return Frame.concat([Frame.wrap(dataset) for dataset in datasets])
+
+
+__all__ = ['Frame', 'to_arrow', 'batch_reader', 'concat']
@@ -0,0 +1,308 @@
+import os
+import json
+import sqlite3
+import logging
+import threading
+
+from datetime import (
+    datetime,
+    timezone
+)
+
+
+class HousekeepingLedger(object):
+    # sqlite ledger of processed files, one indexed row per file name
+    __CHUNK_SIZE = 500
+
+    def __init__(self, db_path: str, name: str = 'housekeeping') -> None:
+        self.db_path = db_path
+        self.logger = logging.getLogger(name)
+
+        self.__local = threading.local()
+        self.__connections: list[sqlite3.Connection] = []
+        self.__lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS processed_files ('
+            'name TEXT PRIMARY KEY, '
+            'size INTEGER, '
+            'mtime REAL, '
+            'processed_at TEXT)'
+        )
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS listing_dirs ('
+            'path TEXT PRIMARY KEY, '
+            'mtime REAL)'
+        )
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS listing_entries ('
+            'path TEXT PRIMARY KEY, '
+            'dir TEXT, '
+            'type TEXT, '
+            'size INTEGER, '
+            'mtime REAL)'
+        )
+        self.conn.execute('CREATE INDEX IF NOT EXISTS listing_entries_dir ON listing_entries (dir)')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS state ('
+            'key TEXT PRIMARY KEY, '
+            'value TEXT)'
+        )
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS runs ('
+            'run_id INTEGER PRIMARY KEY AUTOINCREMENT, '
+            'run_key TEXT, '
+            'started_at TEXT, '
+            'finished_at TEXT, '
+            'status TEXT)'
+        )
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS run_items ('
+            'run_id INTEGER, '
+            'item TEXT, '
+            'status TEXT, '
+            'batches INTEGER, '
+            'state TEXT, '
+            'started_at TEXT, '
+            'updated_at TEXT, '
+            'PRIMARY KEY (run_id, item))'
+        )
+        # ledgers written before runs were keyed per extractor
+        self.__add_column('runs', 'run_key', 'TEXT')
+        self.__add_column('run_items', 'started_at', 'TEXT')
+        self.conn.commit()
+
+    def __add_column(self, table: str, column: str, column_type: str):
+        columns = [row[1] for row in self.conn.execute(f'PRAGMA table_info({table})')]
+
+        if column not in columns:
+            self.conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} {column_type}')
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        # one connection per thread, fan-out branches checkpoint from their own threads
+        conn = getattr(self.__local, 'conn', None)
+
+        if conn is None:
+            # only the owning thread uses it, close() may run on another one
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self.__local.conn = conn
+
+            with self.__lock:
+                self.__connections.append(conn)
+
+        return conn
+
+    def is_empty(self) -> bool:
+        return self.conn.execute('SELECT 1 FROM processed_files LIMIT 1').fetchone() is None
+
+    def import_legacy(self, names: list[str]):
+        # one-time migration of the plain text housekeeping file, size/mtime are unknown
+        with self.conn:
+            self.conn.executemany(
+                'INSERT OR IGNORE INTO processed_files (name) VALUES (?)',
+                [(name,) for name in names if name.strip() != '']
+            )
+
+        self.logger.info(f'imported {len(names)} legacy housekeeping entries into [{self.db_path}]')
+
+    def lookup(self, names: list[str]) -> dict[str, tuple]:
+        found = {}
+
+        for i in range(0, len(names), self.__CHUNK_SIZE):
+            chunk = names[i:i + self.__CHUNK_SIZE]
+            placeholders = ','.join('?' * len(chunk))
+
+            rows = self.conn.execute(
+                f'SELECT name, size, mtime FROM processed_files WHERE name IN ({placeholders})',
+                chunk
+            )
+            found.update({row[0]: row[1:] for row in rows})
+
+        return found
+
+    def get_state(self, key: str) -> str | None:
+        row = self.conn.execute('SELECT value FROM state WHERE key = ?', (key,)).fetchone()
+        return None if row is None else row[0]
+
+    def _set_state(self, key: str, value: str):
+        self.conn.execute('INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)', (key, value))
+
+    def save_state(self, key: str, value: str):
+        with self.conn:
+            self._set_state(key, value)
+
+    def get_watermark(self) -> float | None:
+        watermark = self.get_state('mtime_watermark')
+        return None if watermark is None else float(watermark)
+
+    def cached_listing(self, dir_path: str) -> tuple[float | None, list[dict]]:
+        row = self.conn.execute('SELECT mtime FROM listing_dirs WHERE path = ?', (dir_path,)).fetchone()
+
+        if row is None:
+            return None, []
+
+        entries = [
+            {'name': path, 'type': entry_type, 'size': size, 'mtime': mtime}
+            for path, entry_type, size, mtime in self.conn.execute(
+                'SELECT path, type, size, mtime FROM listing_entries WHERE dir = ?', (dir_path,)
+            )
+        ]
+
+        return row[0], entries
+
+    def save_listing(self, dir_path: str, dir_mtime: float, entries: list[dict]):
+        with self.conn:
+            self.conn.execute('DELETE FROM listing_entries WHERE dir = ?', (dir_path,))
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO listing_entries (path, dir, type, size, mtime) VALUES (?, ?, ?, ?, ?)',
+                [
+                    (entry['name'], dir_path, entry['type'], entry.get('size'), entry.get('mtime'))
+                    for entry in entries
+                ]
+            )
+            self.conn.execute(
+                'INSERT OR REPLACE INTO listing_dirs (path, mtime) VALUES (?, ?)',
+                (dir_path, dir_mtime)
+            )
+
+    def _raise_watermark(self, mtimes: list[float]):
+        watermark = self.get_watermark()
+        mtimes = [mtime for mtime in mtimes if mtime is not None]
+
+        if bool(mtimes) and (watermark is None or max(mtimes) > watermark):
+            self._set_state('mtime_watermark', str(max(mtimes)))
+
+    def _record(self, entries: list[dict]):
+        processed_at = datetime.now(timezone.utc).isoformat()
+
+        self.conn.executemany(
+            'INSERT OR REPLACE INTO processed_files (name, size, mtime, processed_at) '
+            'VALUES (?, ?, ?, ?)',
+            [
+                (entry['name'], entry.get('size'), entry.get('mtime'), processed_at)
+                for entry in entries
+            ]
+        )
+
+    def begin_run(self, run_key: str) -> tuple[int, datetime, bool]:
+        # the unfinished run of the same extractor is resumed, its committed items are not processed again;
+        # the returned time is the start of this attempt
+        row = self.conn.execute(
+            'SELECT run_id, status FROM runs WHERE run_key = ? ORDER BY run_id DESC LIMIT 1', (run_key,)
+        ).fetchone()
+        started_at = datetime.now(timezone.utc)
+
+        with self.conn:
+            if row is not None and row[1] != 'completed':
+                self.conn.execute('UPDATE runs SET status = ? WHERE run_id = ?', ('running', row[0]))
+                return row[0], started_at, True
+
+            cursor = self.conn.execute(
+                'INSERT INTO runs (run_key, started_at, status) VALUES (?, ?, ?)',
+                (run_key, started_at.isoformat(), 'running')
+            )
+
+        return cursor.lastrowid, started_at, False
+
+    def finish_run(self, run_id: int, status: str = 'completed'):
+        # only a completed run raises the watermark, a failed one can leave older files uncommitted
+        with self.conn:
+            if status == 'completed':
+                self._raise_watermark([
+                    row[0] for row in self.conn.execute(
+                        'SELECT mtime FROM processed_files '
+                        'WHERE processed_at >= (SELECT started_at FROM runs WHERE run_id = ?)',
+                        (run_id,)
+                    )
+                ])
+
+            self.conn.execute(
+                'UPDATE runs SET finished_at = ?, status = ? WHERE run_id = ?',
+                (datetime.now(timezone.utc).isoformat(), status, run_id)
+            )
+
+    def committed_files(self, run_id: int) -> set[str]:
+        # files committed since the run started, by any attempt of it
+        rows = self.conn.execute(
+            'SELECT name FROM processed_files WHERE processed_at >= (SELECT started_at FROM runs WHERE run_id = ?)',
+            (run_id,)
+        )
+        return {row[0] for row in rows}
+
+    def has_items(self, run_id: int) -> bool:
+        return self.conn.execute('SELECT 1 FROM run_items WHERE run_id = ? LIMIT 1', (run_id,)).fetchone() is not None
+
+    def get_item(self, run_id: int, item: str) -> tuple[int, dict, datetime | None]:
+        row = self.conn.execute(
+            'SELECT batches, state, started_at FROM run_items WHERE run_id = ? AND item = ? AND status = ?',
+            (run_id, item, 'partial')
+        ).fetchone()
+
+        if row is None:
+            return 0, {}, None
+
+        return row[0], json.loads(row[1]), None if row[2] is None else datetime.fromisoformat(row[2])
+
+    def __save_item(self, run_id: int, item: str, status: str, batches: int, state: dict):
+        # the start of the first attempt of an item is kept, its output names depend on it
+        self.conn.execute(
+            'INSERT INTO run_items (run_id, item, status, batches, state, updated_at) VALUES (?, ?, ?, ?, ?, ?) '
+            'ON CONFLICT (run_id, item) DO UPDATE SET '
+            'status = excluded.status, batches = excluded.batches, state = excluded.state, '
+            'updated_at = excluded.updated_at',
+            (run_id, item, status, batches, json.dumps(state), datetime.now(timezone.utc).isoformat())
+        )
+
+    def start_item(self, run_id: int, item: str, started_at: datetime):
+        with self.conn:
+            self.conn.execute(
+                'INSERT INTO run_items (run_id, item, status, batches, state, started_at, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (run_id, item, 'partial', 0, '{}', started_at.isoformat(), datetime.now(timezone.utc).isoformat())
+            )
+
+    def save_checkpoint(self, run_id: int, item: str, batches: int, state: dict):
+        with self.conn:
+            self.__save_item(run_id, item, 'partial', batches, state)
+
+    def commit_item(self, run_id: int, item: str, entries: list[dict]):
+        # the processed files and the finished item are one transaction
+        with self.conn:
+            self._record(entries)
+            self.__save_item(run_id, item, 'done', 0, {})
+
+    def manifest(self, run_id: int) -> dict:
+        run = self.conn.execute(
+            'SELECT run_id, started_at, finished_at, status FROM runs WHERE run_id = ?', (run_id,)
+        ).fetchone()
+        items = self.conn.execute(
+            'SELECT item, status, batches, updated_at FROM run_items WHERE run_id = ? ORDER BY updated_at', (run_id,)
+        ).fetchall()
+
+        return {
+            'run_id': run[0],
+            'started_at': run[1],
+            'finished_at': run[2],
+            'status': run[3],
+            'items': [
+                {'item': item, 'status': status, 'batches': batches, 'updated_at': updated_at}
+                for item, status, batches, updated_at in items
+            ]
+        }
+
+    def close(self):
+        with self.__lock:
+            for conn in self.__connections:
+                conn.close()
+
+            self.__connections.clear()
+
+        self.__local = threading.local()
+
+
+__all__ = ['HousekeepingLedger']
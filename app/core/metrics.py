@@ -0,0 +1,282 @@
+import os
+import io
+import sys
+import json
+import pstats
+import cProfile
+import logging
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import (
+    datetime,
+    timezone
+)
+from time import (
+    perf_counter_ns,
+    process_time_ns
+)
+
+import pyarrow as pa
+
+try:
+    import resource
+except ImportError:  # windows
+    resource = None
+
+
+def _peak_rss_bytes() -> int | None:
+    if resource is None:
+        return None
+
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # linux reports kilobytes, macos bytes
+    return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+
+def _size_of(data) -> tuple[int, int]:
+    # (rows, bytes) of arrow data and frames, anything else (None, FileScan, lazy plans) is not counted
+    if isinstance(data, (pa.Table, pa.RecordBatch)) or type(data).__name__ == 'Frame':
+        return data.num_rows, data.nbytes
+
+    return 0, 0
+
+
+class StageRun(object):
+    def __init__(self) -> None:
+        self.data_out = None
+        self.wall_ns = 0
+        self.cpu_ns = 0
+
+    def output(self, data):
+        self.data_out = data
+        return data
+
+
+class StageMetrics(object):
+    # cumulative counters of one pipeline component, a stage is measured once per call
+
+    def __init__(self, kind: str, name: str, config_dict: dict) -> None:
+        self.kind = kind
+        self.name = name
+        self.logger = logging.getLogger(name)
+        self.profile: bool = config_dict.get('profile', False)
+        self.profile_dir: str | None = config_dict.get('profile_dir', None)
+        self.memory_pool_stats: bool = config_dict.get('memory_pool_stats', False)
+
+        self.calls = 0
+        self.batches = 0
+        self.rows_in = 0
+        self.rows_out = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.wall_ns = 0
+        self.cpu_ns = 0
+        self.peak_rss_bytes: int | None = None
+        self.pool_bytes_allocated: int | None = None
+        self.pool_max_memory: int | None = None
+        self.files: list[dict] = []
+
+        METRICS.register(self)
+
+    def count_input(self, data):
+        if isinstance(data, Iterator):
+            return self.__count_batches(data, output=False)
+
+        self.__add(data, output=False)
+        return data
+
+    def count_output(self, data):
+        if isinstance(data, Iterator):
+            return self.__count_batches(data, output=True)
+
+        self.__add(data, output=True)
+        return data
+
+    def __add(self, data, output: bool):
+        rows, nbytes = _size_of(data)
+
+        if output:
+            self.rows_out += rows
+            self.bytes_out += nbytes
+        else:
+            self.rows_in += rows
+            self.bytes_in += nbytes
+
+    def __count_batches(self, batches: Iterator, output: bool) -> Iterator:
+        for batch in batches:
+            self.__add(batch, output=output)
+            self.batches += 1
+
+            yield batch
+
+    def record_file(self, file: str, data, wall_ns: int):
+        rows, nbytes = _size_of(data)
+        self.files.append({'file': file, 'rows': rows, 'bytes': nbytes, 'wall_s': wall_ns / 1_000_000_000})
+
+    @contextmanager
+    def measure(self, data_in=None, batch: bool = False):
+        run = StageRun()
+        profiler = cProfile.Profile() if self.profile else None
+
+        if data_in is not None and not isinstance(data_in, Iterator):
+            self.count_input(data_in)
+
+        start_ns = perf_counter_ns()
+        cpu_start_ns = process_time_ns()
+
+        if profiler is not None:
+            profiler.enable()
+
+        try:
+            yield run
+        finally:
+            if profiler is not None:
+                profiler.disable()
+
+            run.wall_ns = perf_counter_ns() - start_ns
+            run.cpu_ns = process_time_ns() - cpu_start_ns
+
+            self.calls += 1
+            self.wall_ns += run.wall_ns
+            self.cpu_ns += run.cpu_ns
+
+            self.__add(run.data_out, output=True)
+            self.batches += 1 if batch else 0
+
+            self.peak_rss_bytes = _peak_rss_bytes()
+
+            if self.memory_pool_stats:
+                self.__record_memory_pool()
+
+            if profiler is not None:
+                self.__dump_profile(profiler)
+
+    def __record_memory_pool(self):
+        pool = pa.default_memory_pool()
+        self.pool_bytes_allocated = pool.bytes_allocated()
+        self.pool_max_memory = pool.max_memory()
+
+        self.logger.info(f"memory pool [{pool.backend_name}]: {self.pool_bytes_allocated} byte(s) allocated, "
+                         f"{self.pool_max_memory} byte(s) peak")
+
+    def __dump_profile(self, profiler: cProfile.Profile):
+        if self.profile_dir is not None:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            profile_path = os.path.join(self.profile_dir, f'{self.name}-{self.calls}.prof')
+            profiler.dump_stats(profile_path)
+            self.logger.info(f'profile written to [{profile_path}]')
+        else:
+            stream = io.StringIO()
+            pstats.Stats(profiler, stream=stream).sort_stats('cumulative').print_stats(15)
+            self.logger.info(f'profile of [{self.name}]:\n{stream.getvalue()}')
+
+    def to_dict(self) -> dict:
+        return {
+            'kind': self.kind,
+            'name': self.name,
+            'calls': self.calls,
+            'batches': self.batches,
+            'rows_in': self.rows_in,
+            'rows_out': self.rows_out,
+            'bytes_in': self.bytes_in,
+            'bytes_out': self.bytes_out,
+            'wall_s': self.wall_ns / 1_000_000_000,
+            'cpu_s': self.cpu_ns / 1_000_000_000,
+            'peak_rss_bytes': self.peak_rss_bytes,
+            'pool_bytes_allocated': self.pool_bytes_allocated,
+            'pool_max_memory': self.pool_max_memory,
+            'files': self.files
+        }
+
+
+class MetricsRegistry(object):
+    PROMETHEUS_FIELDS: dict = {
+        'calls': ('counter', 'stage invocations'),
+        'batches': ('counter', 'record batches processed'),
+        'rows_in': ('counter', 'rows received'),
+        'rows_out': ('counter', 'rows emitted'),
+        'bytes_in': ('counter', 'arrow bytes received'),
+        'bytes_out': ('counter', 'arrow bytes emitted'),
+        'wall_s': ('counter', 'wall time in seconds'),
+        'cpu_s': ('counter', 'process cpu time in seconds'),
+        'peak_rss_bytes': ('gauge', 'peak resident set size of the process'),
+        'pool_max_memory': ('gauge', 'peak bytes of the arrow memory pool')
+    }
+
+    def __init__(self) -> None:
+        self.stages: list[StageMetrics] = []
+        self.conversions: dict[str, dict] = {}
+        self.counters: dict[str, int] = {}
+
+    def register(self, metrics: StageMetrics):
+        self.stages.append(metrics)
+
+    def record_conversion(self, source: str, target: str, nbytes: int):
+        conversion = self.conversions.setdefault(f'{source}->{target}', {'count': 0, 'bytes': 0})
+        conversion['count'] += 1
+        conversion['bytes'] += nbytes
+
+    def increment(self, counter: str, value: int = 1):
+        self.counters[counter] = self.counters.get(counter, 0) + value
+
+    def to_dict(self) -> dict:
+        return {
+            'generated_at': datetime.now(timezone.utc).isoformat(),
+            'stages': [stage.to_dict() for stage in self.stages],
+            'conversions': self.conversions,
+            'counters': self.counters
+        }
+
+    def to_prometheus(self, prefix: str = 'etl_stage') -> str:
+        lines = []
+
+        for field, (metric_type, description) in self.PROMETHEUS_FIELDS.items():
+            metric = f'{prefix}_{field}'
+            lines.append(f'# HELP {metric} {description}')
+            lines.append(f'# TYPE {metric} {metric_type}')
+
+            for stage in self.stages:
+                value = stage.to_dict()[field]
+
+                if value is not None:
+                    lines.append(f'{metric}{{kind="{stage.kind}",stage="{stage.name}"}} {value}')
+
+        for field, description in [('count', 'engine conversions'), ('bytes', 'bytes converted between engines')]:
+            metric = f'etl_conversion_{field}'
+            lines.append(f'# HELP {metric} {description}')
+            lines.append(f'# TYPE {metric} counter')
+
+            for conversion, values in self.conversions.items():
+                source, target = conversion.split('->')
+                lines.append(f'{metric}{{source="{source}",target="{target}"}} {values[field]}')
+
+        for counter, value in self.counters.items():
+            lines.append(f'# TYPE etl_{counter} counter')
+            lines.append(f'etl_{counter} {value}')
+
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def __write_atomic(path: str, content: str):
+        # textfile collectors must never read a half written file
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f'{path}.tmp'
+
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+
+        os.replace(tmp_path, path)
+
+    def export(self, json_path: str | None = None, prometheus_path: str | None = None):
+        if json_path is not None:
+            self.__write_atomic(json_path, json.dumps(self.to_dict(), indent=2))
+
+        if prometheus_path is not None:
+            self.__write_atomic(prometheus_path, self.to_prometheus())
+
+
+METRICS = MetricsRegistry()
+
+
+__all__ = ['StageMetrics', 'MetricsRegistry', 'METRICS']
@@ -0,0 +1,54 @@
+from logging import Logger
+
+from .extractors import (
+    BaseExtractor,
+    CsvFileExtractor
+)
+from .transformers import (
+    BaseTransformer,
+    ChainTransformer,
+    NoOpTransformer,
+    QueryTransformer
+)
+
+
+def _first_query(transformer: BaseTransformer) -> QueryTransformer | None:
+    # the query must see the raw extract, only no-op transformers may run before it
+    transformers = transformer.transformers if isinstance(transformer, ChainTransformer) else [transformer]
+
+    for candidate in transformers:
+        if isinstance(candidate, QueryTransformer):
+            return candidate
+
+        if not isinstance(candidate, NoOpTransformer):
+            return None
+
+    return None
+
+
+def plan_pushdown(extractor: BaseExtractor, transformer: BaseTransformer, logger: Logger,
+                  over_budget: bool = False) -> bool:
+    # with 'over_budget' only inputs larger than the memory buffer are scanned, instead of being streamed
+    if not isinstance(extractor, CsvFileExtractor) or extractor.storage_backend != 'fs' or extractor.streaming:
+        logger.info('pushdown skipped: extractor can not be scanned by a query engine')
+        return False
+
+    query = _first_query(transformer)
+
+    if query is None or query.use_package not in ['duckdb', 'polars']:
+        logger.info('pushdown skipped: first transformer is not a duckdb/polars query')
+        return False
+
+    if over_budget:
+        extractor.pushdown_over_budget = True
+        logger.info(f'pushdown over budget: [{query.name}] scans the files of [{extractor.name}] larger than '
+                    f"the memory buffer using 'package' = {query.use_package}")
+        return True
+
+    extractor.pushdown = True
+    logger.info(f'pushdown enabled: [{query.name}] scans the files of [{extractor.name}] '
+                f"using 'package' = {query.use_package}")
+    return True
+
+
+__all__ = ['plan_pushdown']
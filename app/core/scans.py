@@ -0,0 +1,20 @@
+import pyarrow as pa
+
+from typing import Literal
+
+
+class FileScan(object):
+    # a deferred read of files, handed to a query transformer so the engine scans the files itself
+
+    def __init__(self, files: str | list[str], file_format: Literal['csv'] = 'csv',
+                 schema: pa.Schema | None = None) -> None:
+        self.files = files if isinstance(files, list) else [files]
+        self.file_format = file_format
+        # explicit column types, the engine skips type inference
+        self.schema = schema
+
+    def __repr__(self) -> str:
+        return f'FileScan(format={self.file_format}, files={len(self.files)})'
+
+
+__all__ = ['FileScan']
@@ -1,11 +1,23 @@
 from .base import BaseStorage
-from .files import CsvStorage
+from .files import (
+    CsvStorage,
+    ParquetStorage,
+    ArrowIpcStorage
+)
+from .database import (
+    DuckDbStorage,
+    SqliteStorage
+)
 
 
 class StorageManager(object):
     STORAGES: dict = {
         BaseStorage.TYPE: BaseStorage,
-        CsvStorage.TYPE: CsvStorage
+        CsvStorage.TYPE: CsvStorage,
+        ParquetStorage.TYPE: ParquetStorage,
+        ArrowIpcStorage.TYPE: ArrowIpcStorage,
+        DuckDbStorage.TYPE: DuckDbStorage,
+        SqliteStorage.TYPE: SqliteStorage
     }
 
     @classmethod
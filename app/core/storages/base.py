@@ -1,10 +1,10 @@
 import logging
-from time import perf_counter_ns
 from abc import (
     ABC,
     abstractmethod
 )
 
+from ..metrics import StageMetrics
 from ...utils import format_perf_ns_to_time
 
 
@@ -16,15 +16,15 @@ class BaseStorage(ABC):
         self.config_dict = config_dict
         self.name = self.config_dict['name']
         self.logger = logging.getLogger(self.name)
+        self.metrics = StageMetrics('storage', self.name, self.config_dict)
 
     def _store(self, data):
-        start_ns = perf_counter_ns()
+        data = self.metrics.count_input(data)
 
-        response = self.do_store(data)
+        with self.metrics.measure() as run:
+            response = self.do_store(data)
 
-        end_ns = perf_counter_ns()
-        elapsed_ns = end_ns - start_ns
-        formatted_time = format_perf_ns_to_time(elapsed_ns)
+        formatted_time = format_perf_ns_to_time(run.wall_ns)
 
         self.logger.info(f'storage [{self.name}] completed in {formatted_time}')
 
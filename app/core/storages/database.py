@@ -0,0 +1,317 @@
+import os
+import atexit
+import sqlite3
+import logging
+import threading
+
+import pyarrow as pa
+import pyarrow.compute as pc
+from pyarrow import (
+    RecordBatch,
+    Table
+)
+from collections.abc import Iterator
+
+from typing import Literal
+
+from .base import BaseStorage
+from ..frames import (
+    Frame,
+    to_arrow
+)
+from ..budget import BUDGET
+from ..checkpoints import (
+    current_checkpoint,
+    current_run
+)
+from ..engines import EngineManager
+
+duckdb = EngineManager.get_engine('duckdb')
+
+
+def _quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+class ConnectionPool(object):
+    # one persistent connection per database file and thread, shared by every storage writing to it
+    __connections: dict = {}
+    __locks: dict = {}
+    __lock = threading.Lock()
+
+    @classmethod
+    def get(cls, engine: Literal['duckdb', 'sqlite'], db_path: str):
+        pool_key = (engine, os.path.abspath(db_path))
+        thread_key = (*pool_key, threading.get_ident())
+
+        with cls.__lock:
+            if thread_key not in cls.__connections:
+                os.makedirs(os.path.dirname(pool_key[1]), exist_ok=True)
+
+                if engine == 'duckdb':
+                    # a database file is opened once, threads get cursors of it
+                    if pool_key not in cls.__connections:
+                        cls.__connections[pool_key] = duckdb.connect(db_path, config=BUDGET.duckdb_config())
+
+                    cls.__connections[thread_key] = cls.__connections[pool_key].cursor()
+                else:
+                    # transactions are opened explicitly per batch, close_all runs on another thread
+                    cls.__connections[thread_key] = sqlite3.connect(
+                        db_path, isolation_level=None, check_same_thread=False
+                    )
+
+                logging.getLogger('connection_pool').info(f'opened [{engine}] connection to [{db_path}]')
+
+            return cls.__connections[thread_key]
+
+    @classmethod
+    def lock(cls, engine: Literal['duckdb', 'sqlite'], db_path: str) -> threading.Lock:
+        # writers of the same database file take turns, one transaction at a time
+        with cls.__lock:
+            return cls.__locks.setdefault((engine, os.path.abspath(db_path)), threading.Lock())
+
+    @classmethod
+    def close_all(cls):
+        with cls.__lock:
+            # duckdb cursors are closed before the connection they were opened from
+            for connection in reversed(list(cls.__connections.values())):
+                connection.close()
+
+            cls.__connections.clear()
+
+
+atexit.register(ConnectionPool.close_all)
+
+
+class DatabaseStorage(BaseStorage):
+    TYPE = 'DATABASE_STORAGE'
+    ENGINE: Literal['duckdb', 'sqlite'] = None
+
+    def __init__(self, config_dict):
+        super().__init__(config_dict)
+        self.path: str = config_dict['path']
+        self.table: str = config_dict['table']
+        self.mode: Literal['append', 'replace', 'upsert'] = config_dict.get('mode', 'append')
+        self.primary_key: list[str] = config_dict.get('primary_key', None) or []
+        self.batch_size: int | None = config_dict.get('batch_size', None)
+        # the run the table was replaced in, later stores of the same run append
+        self._replaced_in: object | None = None
+
+        assert self.mode in ['append', 'replace', 'upsert'], f'unknown storage mode: [{self.mode}]'
+        assert self.mode != 'upsert' or bool(self.primary_key), "'primary_key' is required by 'mode' = upsert"
+
+    @property
+    def connection(self):
+        return ConnectionPool.get(self.ENGINE, self.path)
+
+    def _batches(self, item) -> list:
+        if isinstance(item, Frame) and self.ENGINE == 'duckdb':
+            return [item]
+
+        if isinstance(to_arrow(item), Table) and self.batch_size is not None:
+            return to_arrow(item).to_batches(max_chunksize=self.batch_size)
+
+        return [to_arrow(item)]
+
+    @property
+    def _replaced(self) -> bool:
+        return self._replaced_in is not None and self._replaced_in is current_run()
+
+    @_replaced.setter
+    def _replaced(self, replaced: bool):
+        self._replaced_in = current_run() if replaced else None
+
+    @property
+    def lock(self) -> threading.Lock:
+        return ConnectionPool.lock(self.ENGINE, self.path)
+
+    def _begin(self):
+        self.lock.acquire()
+
+        try:
+            self.connection.execute('BEGIN TRANSACTION')
+        except Exception:
+            self.lock.release()
+            raise
+
+    def _commit(self):
+        # a failed commit is still open, the rollback releases the lock
+        self.connection.execute('COMMIT')
+        self.lock.release()
+
+    def _rollback(self):
+        try:
+            self.connection.execute('ROLLBACK')
+        finally:
+            self.lock.release()
+
+    def _write_batch(self, batch):
+        raise NotImplementedError()
+
+    def do_store(self, data):
+        self.logger.info(f"store into [{self.path}] table [{self.table}] using 'mode' = {self.mode}")
+
+        checkpoint = current_checkpoint()
+        checkpointed = checkpoint is not None and checkpoint.claim(self.name)
+        num_rows = 0
+        num_transactions = 0
+        in_transaction = False
+
+        if checkpoint is not None and checkpoint.resumed:
+            # the table was replaced by an earlier attempt of the same run
+            self._replaced = True
+
+        # streamed transformers emit one item per batch, every batch is written in its own transaction;
+        # with batch checkpoints a transaction spans the checkpoint window, a resume never writes a batch twice
+        try:
+            for item in data if isinstance(data, Iterator) else [data]:
+                for batch in self._batches(item):
+                    if not in_transaction:
+                        self._begin()
+                        in_transaction = True
+
+                    self._write_batch(batch)
+                    num_rows += batch.num_rows
+
+                    if not checkpointed:
+                        self._commit()
+                        in_transaction = False
+                        num_transactions += 1
+
+                if checkpointed and checkpoint.batch_written():
+                    if in_transaction:
+                        self._commit()
+                        in_transaction = False
+                        num_transactions += 1
+
+                    checkpoint.commit_batches({'table': self.table})
+
+            if in_transaction:
+                self._commit()
+                in_transaction = False
+                num_transactions += 1
+        except Exception:
+            if in_transaction:
+                self._rollback()
+
+            raise
+
+        self.logger.info(f'stored {num_rows} row(s) in {num_transactions} transaction(s) into [{self.table}]')
+        return None
+
+
+class DuckDbStorage(DatabaseStorage):
+    TYPE = 'DUCKDB_STORAGE'
+    ENGINE = 'duckdb'
+
+    __BATCH_VIEW = '__etl_batch'
+
+    def _write_batch(self, batch: Table | RecordBatch | Frame):
+        conn = self.connection
+        table = _quote(self.table)
+        view = _quote(self.__BATCH_VIEW)
+
+        # duckdb scans the arrow or pandas object in place, INSERT ... SELECT is a vectorized bulk insert
+        native = batch.native if isinstance(batch, Frame) and batch.engine == 'pandas' else to_arrow(batch)
+
+        if isinstance(native, RecordBatch):
+            # a registered record batch is a one-shot stream, upserts scan it twice
+            native = Table.from_batches([native])
+
+        conn.register(self.__BATCH_VIEW, native)
+
+        try:
+            if self.mode == 'replace' and not self._replaced:
+                # replace once per run, later files of the same run are appended
+                conn.execute(f'CREATE OR REPLACE TABLE {table} AS SELECT * FROM {view}')
+                self._replaced = True
+                return
+
+            conn.execute(f'CREATE TABLE IF NOT EXISTS {table} AS SELECT * FROM {view} LIMIT 0')
+
+            if self.mode == 'upsert':
+                keys = ', '.join(_quote(key) for key in self.primary_key)
+                conn.execute(f'DELETE FROM {table} WHERE ({keys}) IN (SELECT {keys} FROM {view})')
+
+            conn.execute(f'INSERT INTO {table} BY NAME SELECT * FROM {view}')
+        finally:
+            conn.unregister(self.__BATCH_VIEW)
+
+
+class SqliteStorage(DatabaseStorage):
+    TYPE = 'SQLITE_STORAGE'
+    ENGINE = 'sqlite'
+
+    def __init__(self, config_dict):
+        super().__init__(config_dict)
+        self.batch_size = self.batch_size or 10_000
+
+    @staticmethod
+    def __column_type(data_type: pa.DataType) -> str:
+        if pa.types.is_integer(data_type) or pa.types.is_boolean(data_type):
+            return 'INTEGER'
+
+        if pa.types.is_floating(data_type) or pa.types.is_decimal(data_type):
+            return 'REAL'
+
+        if pa.types.is_binary(data_type) or pa.types.is_large_binary(data_type):
+            return 'BLOB'
+
+        return 'TEXT'
+
+    def __create_table(self, schema: pa.Schema):
+        table = _quote(self.table)
+        columns = ', '.join(f'{_quote(field.name)} {self.__column_type(field.type)}' for field in schema)
+
+        self.connection.execute(f'CREATE TABLE IF NOT EXISTS {table} ({columns})')
+
+        if self.mode == 'upsert':
+            # a plain index, so upserts also work on tables that already hold duplicate keys
+            keys = ', '.join(_quote(key) for key in self.primary_key)
+            index = _quote(f"{self.table}_{'_'.join(self.primary_key)}_key")
+            self.connection.execute(f'CREATE INDEX IF NOT EXISTS {index} ON {table} ({keys})')
+
+    @staticmethod
+    def __rows(batch: Table | RecordBatch) -> Iterator[tuple]:
+        columns = []
+
+        for column in batch.columns:
+            # sqlite has no temporal types, dates and timestamps are stored as iso strings
+            if pa.types.is_temporal(column.type):
+                column = pc.cast(column, pa.string())
+
+            # decimals are REAL columns, sqlite3 cannot bind decimal.Decimal
+            if pa.types.is_decimal(column.type):
+                column = pc.cast(column, pa.float64())
+
+            columns.append(column.to_pylist())
+
+        return zip(*columns)
+
+    def _write_batch(self, batch: Table | RecordBatch):
+        table = _quote(self.table)
+
+        if self.mode == 'replace' and not self._replaced:
+            # replace once per run, later files of the same run are appended
+            self.connection.execute(f'DROP TABLE IF EXISTS {table}')
+            self._replaced = True
+
+        self.__create_table(batch.schema)
+
+        if self.mode == 'upsert':
+            condition = ' AND '.join(f'{_quote(key)} = ?' for key in self.primary_key)
+            self.connection.executemany(
+                f'DELETE FROM {table} WHERE {condition}',
+                self.__rows(batch.select(self.primary_key))
+            )
+
+        columns = ', '.join(_quote(name) for name in batch.schema.names)
+        placeholders = ', '.join('?' * batch.num_columns)
+
+        self.connection.executemany(
+            f'INSERT INTO {table} ({columns}) VALUES ({placeholders})',
+            self.__rows(batch)
+        )
+
+
+__all__ = ['ConnectionPool', 'DatabaseStorage', 'DuckDbStorage', 'SqliteStorage']
@@ -1,10 +1,10 @@
 import os
-import duckdb
+import itertools
 
+import pyarrow as pa
 import pyarrow.csv as pc
-import pyarrow.dataset as ds
-import polars as pl
 from pyarrow import Table
+from collections.abc import Iterator
 
 from datetime import (
     datetime,
@@ -16,6 +16,17 @@ from fsspec import AbstractFileSystem
 from typing import Literal
 
 from .base import BaseStorage
+from ..frames import (
+    Frame,
+    to_arrow
+)
+from ..budget import BUDGET
+from ..checkpoints import current_checkpoint
+from ..engines import EngineManager
+
+duckdb = EngineManager.get_engine('duckdb')
+ds = EngineManager.get_engine('arrow_ds')
+pl = EngineManager.get_engine('polars')
 
 
 class FileStorage(BaseStorage):
@@ -26,7 +37,195 @@ class FileStorage(BaseStorage):
         self.storage_backend: Literal['fs', 's3', 'gcs', 'abs'] = config_dict['storage_backend']
         self.path = config_dict['path']
         self.key = config_dict['key']
-        self.use_package: Literal['arrow', 'arrow_ds', 'pandas', 'polars', 'duckdb'] = self.config_dict['use_package']
+        self.use_package: Literal['arrow', 'arrow_ds', 'pandas', 'polars', 'duckdb'] = self.config_dict.get('use_package', 'arrow')
+        self.time_fmt = config_dict.get('time_fmt', '%Y-%m-%dT%H:%M:%S.%f%z')
+        self.row_group_size: int | None = config_dict.get('row_group_size', None)
+        self.max_rows_per_file: int | None = config_dict.get('max_rows_per_file', None)
+        self.max_file_size: int | None = config_dict.get('max_file_size', None)
+
+    def _rows_per_file(self, data: Table | pa.RecordBatch) -> int | None:
+        max_rows = self.max_rows_per_file
+
+        if self.max_file_size is not None and data.num_rows > 0:
+            # uncompressed row width, so the cap holds for any codec
+            row_size = max(1, data.nbytes // data.num_rows)
+            size_rows = max(1, self.max_file_size // row_size)
+            max_rows = size_rows if max_rows is None else min(max_rows, size_rows)
+
+        return max_rows
+
+    def _rows_per_group(self, data: Table | pa.RecordBatch, max_rows_per_file: int | None) -> int | None:
+        max_rows_per_group = self.row_group_size
+
+        if max_rows_per_group is None and BUDGET.enabled and data.num_rows > 0:
+            # write_dataset buffers a whole row group per open file, keep it inside the buffer budget
+            row_size = max(1, data.nbytes // data.num_rows)
+            max_rows_per_group = max(1, min(1 << 20, BUDGET.buffer_bytes() // row_size))
+
+        if max_rows_per_file is not None:
+            # write_dataset rejects groups larger than a file, its default group is 1Mi rows
+            max_rows_per_group = min(max_rows_per_group or 1 << 20, max_rows_per_file)
+
+        return max_rows_per_group
+
+    def _file_name(self) -> str:
+        checkpoint = current_checkpoint()
+
+        # checkpointed items keep their name across attempts, a retry overwrites its partial output
+        if checkpoint is not None:
+            return checkpoint.output_name(self.key, self.time_fmt)
+
+        return f'{self.key}-{datetime.now(timezone.utc).strftime(self.time_fmt)}'
+
+
+class CsvPartWriter(object):
+    # writes batches into numbered csv parts, a part is renamed into place once it is complete
+    COMPRESSIONS: dict = {
+        'gzip': 'gz',
+        'zstd': 'zst'
+    }
+
+    def __init__(self, base_path: str, rolling: bool, max_rows: int | None = None,
+                 max_bytes: int | None = None, compression: str | None = None) -> None:
+        self.base_path = base_path
+        self.rolling = rolling
+        self.max_rows = max_rows
+        # uncompressed csv bytes, a compressed part is smaller on disk
+        self.max_bytes = max_bytes
+        self.compression = compression
+        self.file_ext = 'csv' if compression is None else f'csv.{self.COMPRESSIONS[compression]}'
+        self.part = 0
+        self.part_rows = 0
+        self.part_bytes = 0
+        self.paths: list[str] = []
+        self.__file = None
+        self.__sink = None
+        self.__row_size: float | None = None
+
+    def part_path(self, part: int) -> str:
+        # parts are numbered from 0 in write order, a single output keeps the plain name
+        name = f'{self.base_path}-{part:05d}' if self.rolling else self.base_path
+        return f'{name}.{self.file_ext}'
+
+    @staticmethod
+    def _encode(data: pa.RecordBatch | Table, include_header: bool = False) -> pa.Buffer:
+        # rows are encoded before they are written, so the size of a part is known exactly
+        buffer = pa.BufferOutputStream()
+        pc.write_csv(data, buffer, write_options=pc.WriteOptions(include_header=include_header))
+        return buffer.getvalue()
+
+    def resume(self, state: dict):
+        # parts before the checkpointed one are complete, the checkpointed one is cut back to its offset
+        self.part = state['part']
+        self.part_rows = state['rows']
+        self.part_bytes = state.get('bytes', state['offset'])
+        tmp_path = f'{self.part_path(self.part)}.tmp'
+
+        if not os.path.exists(tmp_path) and os.path.exists(self.part_path(self.part)):
+            os.replace(self.part_path(self.part), tmp_path)
+
+        self.paths = [self.part_path(part) for part in range(self.part)]
+
+        if state['offset'] == 0:
+            # the checkpoint fell on a part boundary, the next part starts with its header
+            return
+
+        file = open(tmp_path, mode='r+b')
+        file.truncate(state['offset'])
+        file.seek(state['offset'])
+        self.__open_sink(file)
+
+    def state(self) -> dict:
+        if self.__sink is None:
+            return {'path': self.base_path, 'part': self.part, 'rows': 0, 'bytes': 0, 'offset': 0}
+
+        if self.compression is not None:
+            # end the compressed frame, gzip members and zstd frames can be concatenated
+            self.__close_sink()
+            self.__open_sink(open(f'{self.part_path(self.part)}.tmp', mode='ab'))
+
+        self.__file.flush()
+        os.fsync(self.__file.fileno())
+
+        return {'path': self.base_path, 'part': self.part, 'rows': self.part_rows, 'bytes': self.part_bytes,
+                'offset': self.__file.tell()}
+
+    def __open_sink(self, file):
+        self.__file = file
+        self.__sink = file if self.compression is None else pa.CompressedOutputStream(file, self.compression)
+
+    def __close_sink(self):
+        self.__sink.close()
+
+        if not self.__file.closed:
+            self.__file.close()
+
+        self.__file = None
+        self.__sink = None
+
+    def __open(self, schema: pa.Schema):
+        self.__open_sink(open(f'{self.part_path(self.part)}.tmp', mode='wb'))
+        header = self._encode(schema.empty_table(), include_header=True)
+        self.__sink.write(header)
+        self.part_rows = 0
+        self.part_bytes = header.size
+
+    def __close(self):
+        self.__close_sink()
+        os.replace(f'{self.part_path(self.part)}.tmp', self.part_path(self.part))
+        self.paths.append(self.part_path(self.part))
+
+    def __roll(self):
+        self.__close()
+        self.part += 1
+
+    def write(self, batch: pa.RecordBatch | Table):
+        while batch.num_rows > 0:
+            if self.__sink is None:
+                self.__open(batch.schema)
+
+            # split at the row limit, every part except the last holds exactly max_rows
+            take = batch.num_rows if self.max_rows is None else min(batch.num_rows, self.max_rows - self.part_rows)
+
+            if self.max_bytes is not None and self.__row_size is not None:
+                take = min(take, max(1, int((self.max_bytes - self.part_bytes) // self.__row_size)))
+
+            encoded = self._encode(batch.slice(0, take))
+
+            if self.max_bytes is not None:
+                remaining = self.max_bytes - self.part_bytes
+
+                while encoded.size > remaining and take > 1:
+                    # shrink to the measured csv width until the rows fit
+                    take = max(1, min(take - 1, int(take * remaining / encoded.size)))
+                    encoded = self._encode(batch.slice(0, take))
+
+                if encoded.size > remaining and self.part_rows > 0 and self.rolling:
+                    # not even one more row fits, it starts the next part
+                    self.__roll()
+                    continue
+
+                self.__row_size = encoded.size / take
+
+            self.__sink.write(encoded)
+            self.part_rows += take
+            self.part_bytes += encoded.size
+            batch = batch.slice(take)
+
+            full_rows = self.max_rows is not None and self.part_rows >= self.max_rows
+            full_bytes = self.max_bytes is not None and self.part_bytes + self.__row_size > self.max_bytes
+
+            if self.rolling and (full_rows or full_bytes):
+                self.__roll()
+
+    def close(self):
+        if self.__sink is not None:
+            self.__close()
+
+    def abort(self):
+        # the temporary part stays on disk, a checkpointed retry resumes it
+        if self.__sink is not None:
+            self.__close_sink()
 
 
 class CsvStorage(FileStorage):
@@ -34,33 +233,118 @@ class CsvStorage(FileStorage):
 
     def __init__(self, config_dict):
         super().__init__(config_dict)
-        self.time_fmt = config_dict.get('time_fmt', '%Y-%m-%dT%H:%M:%S.%f%z')
+        self.compression: Literal['gzip', 'zstd'] | None = config_dict.get('compression', None)
+
+        assert self.compression is None or self.compression in CsvPartWriter.COMPRESSIONS, \
+            f'unknown csv compression: [{self.compression}]'
+
+    @property
+    def rolling(self) -> bool:
+        return self.max_rows_per_file is not None or self.max_file_size is not None
+
+    def __use_arrow_ds(self, fs: AbstractFileSystem, file_path: str, data: Frame):
+        data = data.to_arrow()
+        max_rows_per_file = self._rows_per_file(data)
+        tmp_path = f'{file_path}.tmp'
+
+        # parts are written next to the output and renamed into it once all of them are complete
+        if fs.exists(tmp_path):
+            fs.rm(tmp_path, recursive=True)
 
-    def __use_arrow_ds(self, fs: AbstractFileSystem, file_path: str, data: Table):
         ds.write_dataset(
             data=data,
-            base_dir=file_path,
+            base_dir=tmp_path,
+            basename_template='part-{i}.csv',
             format='csv',
+            max_rows_per_file=max_rows_per_file,
+            max_rows_per_group=self._rows_per_group(data, max_rows_per_file),
+            existing_data_behavior='overwrite_or_ignore',
             filesystem=fs
         )
 
-    def __use_arrow(self, file_path: str, data: Table):
-        pc.write_csv(data, file_path)
+        fs.makedirs(file_path, exist_ok=True)
 
-    def __use_pandas(self, file_path: str, data: Table):
-        df = data.to_pandas()
+        for part in sorted(fs.ls(tmp_path, detail=False)):
+            fs.mv(part, f"{file_path}/{part.rsplit('/', 1)[-1]}")
+
+        fs.rm(tmp_path, recursive=True)
+
+    def __use_arrow(self, file_path: str, data: Frame):
+        pc.write_csv(data.to_arrow(), file_path)
+
+    def __use_pandas(self, file_path: str, data: Frame):
+        df = data.to('pandas')
         df.to_csv(file_path)
 
-    def __use_polars(self, file_path: str, data: Table):
-        df = pl.from_arrow(data)
+    def __use_polars(self, file_path: str, data: Frame):
+        df = data.to('polars')
         df.write_csv(file_path)
 
-    def __use_duckdb(self, file_path: str, data: Table):
-        duckdb.sql('select * from data').write_csv(file_path)
+    def __use_duckdb(self, file_path: str, data: Frame):
+        data.to_duckdb().write_csv(file_path)
+
+    def _part_writer(self) -> CsvPartWriter:
+        return CsvPartWriter(os.path.join(self.path, self._file_name()), self.rolling, self.max_rows_per_file,
+                             self.max_file_size, self.compression)
+
+    def _write_csv_batches(self, fs: AbstractFileSystem, batches: Iterator):
+        self.logger.info(f"stream batches using 'package' = arrow")
+
+        if self.use_package != 'arrow':
+            self.logger.warning(f"streaming is only supported by 'package' = arrow, ignore {self.use_package}")
+
+        writer = self._part_writer()
+        checkpoint = current_checkpoint()
+        checkpointed = checkpoint is not None and checkpoint.claim(self.name)
+        resume = checkpointed and checkpoint.state.get('path') == writer.base_path
+        num_rows = 0
+
+        try:
+            for batch in map(to_arrow, batches):
+                if resume:
+                    # drop whatever was written after the last checkpoint and append below it
+                    writer.resume(checkpoint.state)
+                    self.logger.info(f"resume [{writer.part_path(writer.part)}] at byte {checkpoint.state['offset']}")
+                    resume = False
+
+                writer.write(batch)
+                num_rows += batch.num_rows
+
+                if checkpointed and checkpoint.batch_written():
+                    checkpoint.commit_batches(writer.state())
+        except BaseException:
+            writer.abort()
+            raise
+
+        writer.close()
+        self.logger.info(f'streamed {num_rows} row(s) to {len(writer.paths)} file(s) [{writer.base_path}]')
+
+    def _write_parts(self, data: Frame):
+        self.logger.info(f"write parts using 'max_rows_per_file' = {self.max_rows_per_file}, "
+                         f"'max_file_size' = {self.max_file_size}, 'compression' = {self.compression}")
+
+        if self.use_package != 'arrow':
+            self.logger.warning(f"rolling and compressed files are only supported by 'package' = arrow, "
+                                f"ignore {self.use_package}")
 
-    def _write_csv(self, fs: AbstractFileSystem, data: Table):
+        writer = self._part_writer()
+
+        try:
+            # written in chunks of 'row_group_size' rows, the limits are checked after every chunk
+            for batch in data.to_arrow().to_batches(max_chunksize=self.row_group_size or 65_536):
+                writer.write(batch)
+        except BaseException:
+            writer.abort()
+            raise
+
+        writer.close()
+        self.logger.info(f'wrote {data.num_rows} row(s) to {len(writer.paths)} file(s) [{writer.base_path}]')
+
+    def _write_csv(self, fs: AbstractFileSystem, data: Table | Frame):
         self.logger.info(f"store files using 'package' = {self.use_package}")
 
+        data = Frame.wrap(data)
+
         package_mgr: dict = {
             'arrow': self.__use_arrow,
             'pandas': self.__use_pandas,
@@ -68,19 +352,113 @@ class CsvStorage(FileStorage):
             'duckdb': self.__use_duckdb
         }
 
-        file_path = os.path.join(self.path, f'{self.key}-{datetime.now(timezone.utc).strftime(self.time_fmt)}')
+        file_path = os.path.join(self.path, self._file_name())
 
-        if self.storage_backend != 'fs' or self.use_package == 'arrow_ds':
+        if self.storage_backend != 'fs' or (self.use_package == 'arrow_ds' and self.compression is None):
             return self.__use_arrow_ds(fs, file_path, data)
+        elif self.rolling or self.compression is not None:
+            return self._write_parts(data)
         else:
+            # readers never see a half written file, the rename is atomic
             fs_writer = package_mgr[self.use_package]
-            return fs_writer(f'{file_path}.csv', data)
+            fs_writer(f'{file_path}.csv.tmp', data)
+            os.replace(f'{file_path}.csv.tmp', f'{file_path}.csv')
+
+    def do_store(self, data):
+        if self.storage_backend == 'fs':
+            self.logger.info(f"store files using 'storage_backend' = [{self.storage_backend}]")
+            fs = LocalFileSystem(auto_mkdir=True)
+            fs.makedirs(self.path, exist_ok=True)
+
+            if isinstance(data, Iterator):
+                self._write_csv_batches(fs, data)
+            else:
+                self._write_csv(fs, data)
+
+            return None
+        else:
+            raise NotImplementedError()
+
+
+class ArrowDatasetStorage(FileStorage):
+    TYPE = 'ARROW_DATASET_STORAGE'
+    FORMAT: Literal['parquet', 'ipc'] = None
+    FILE_EXT: str = None
+
+    def __init__(self, config_dict):
+        super().__init__(config_dict)
+        self.compression: str | None = config_dict.get('compression', None)
+        self.partition_by: list[str] | None = config_dict.get('partition_by', None)
+
+    def _file_format(self) -> 'ds.FileFormat':
+        file_formats: dict = {
+            'parquet': ds.ParquetFileFormat,
+            'ipc': ds.IpcFileFormat
+        }
+
+        return file_formats[self.FORMAT]()
+
+    def _write_dataset(self, fs: AbstractFileSystem, data: Table | Iterator):
+        self.logger.info(f"store files using 'format' = {self.FORMAT}, 'compression' = {self.compression}")
+
+        schema = None
+
+        if isinstance(data, Iterator):
+            # transformers may emit tables per batch, write_dataset only accepts record batches
+            data = itertools.chain.from_iterable(
+                item.to_batches() if isinstance(item, Table) else [item] for item in map(to_arrow, data)
+            )
+            first = next(data, None)
+
+            if first is None:
+                self.logger.warning('no batches to store')
+                return None
+
+            schema = first.schema
+            sample = first
+            data = itertools.chain([first], data)
+        else:
+            data = to_arrow(data)
+            sample = data
+
+        file_format = self._file_format()
+        file_options = file_format.make_write_options(compression=self.compression)
+
+        max_rows_per_file = self._rows_per_file(sample)
+        max_rows_per_group = self._rows_per_group(sample, max_rows_per_file)
+
+        ds.write_dataset(
+            data=data,
+            base_dir=self.path,
+            basename_template=f'{self._file_name()}-{{i}}.{self.FILE_EXT}',
+            format=file_format,
+            file_options=file_options,
+            schema=schema,
+            partitioning=self.partition_by,
+            partitioning_flavor='hive' if self.partition_by else None,
+            max_rows_per_file=max_rows_per_file,
+            max_rows_per_group=max_rows_per_group,
+            existing_data_behavior='overwrite_or_ignore',
+            filesystem=fs
+        )
 
     def do_store(self, data):
         if self.storage_backend == 'fs':
             self.logger.info(f"store files using 'storage_backend' = [{self.storage_backend}]")
             fs = LocalFileSystem(auto_mkdir=True)
-            self._write_csv(fs, data)
+            self._write_dataset(fs, data)
             return None
         else:
             raise NotImplementedError()
+
+
+class ParquetStorage(ArrowDatasetStorage):
+    TYPE = 'PARQUET_FILE_STORAGE'
+    FORMAT = 'parquet'
+    FILE_EXT = 'parquet'
+
+
+class ArrowIpcStorage(ArrowDatasetStorage):
+    TYPE = 'ARROW_IPC_FILE_STORAGE'
+    FORMAT = 'ipc'
+    FILE_EXT = 'arrow'
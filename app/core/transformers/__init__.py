@@ -1,10 +1,36 @@
+import os
+import tempfile
+import itertools
+import contextvars
+
+import pyarrow as pa
+
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter_ns
+
 from .base import BaseTransformer
 from .common import (
     NoOpTransformer,
     QueryTransformer
 )
 
-from ..storages import BaseStorage
+from ..frames import (
+    batch_reader,
+    to_arrow
+)
+from ..checkpoints import disable_batch_checkpoints
+from ..cache import (
+    RESULT_CACHE,
+    current_fingerprint,
+    derive_fingerprint,
+    set_fingerprint
+)
+from ..storages import (
+    BaseStorage,
+    StorageManager
+)
+from ...utils import format_perf_ns_to_time
 
 
 class ChainTransformer(BaseTransformer):
@@ -13,20 +39,220 @@ class ChainTransformer(BaseTransformer):
     def __init__(self, config_dict, storage):
         super().__init__(config_dict, storage)
         self.configs = config_dict['transforms']
+        self.lazy: bool = config_dict.get('lazy', False)
 
         self.__transformers = [TransformerManager.create_transformer(cfg, None) for cfg in self.configs]
+        self.__stages = self._fuse_stages(self.__transformers)
+
+    @property
+    def transformers(self) -> list[BaseTransformer]:
+        return list(self.__transformers)
+
+    def _fuse_stages(self, transformers: list[BaseTransformer]) -> list[list[BaseTransformer]]:
+        # with 'lazy', consecutive query transformers on the same package share one stage
+        stages = []
+
+        for transformer in transformers:
+            previous = stages[-1][-1] if bool(stages) else None
+
+            if (self.lazy and isinstance(transformer, QueryTransformer)
+                    and isinstance(previous, QueryTransformer)
+                    and previous.use_package == transformer.use_package):
+                stages[-1].append(transformer)
+            else:
+                stages.append([transformer])
+
+        return stages
+
+    def signature(self) -> dict | None:
+        # every stage derives the lineage itself
+        return None
+
+    def _transform(self, data):
+        if not isinstance(data, Iterator) or isinstance(data, pa.RecordBatchReader):
+            return super()._transform(data)
+
+        # stages get the whole stream, a query across rows must not run per batch
+        data = self.do_transform(data=data)
+
+        if self.storage is None:
+            return data
+
+        return self.storage._store(data=data)
+
+    def _run_fused(self, stage: list[QueryTransformer], data):
+        start_ns = perf_counter_ns()
+
+        fingerprint = current_fingerprint()
+        for transformer in stage:
+            fingerprint = derive_fingerprint(fingerprint, transformer.signature())
+
+        cache_key = None
+        if RESULT_CACHE.enabled and current_fingerprint() is not None and all(t.cache for t in stage):
+            cache_key = fingerprint
+
+        cached = RESULT_CACHE.get(cache_key) if cache_key is not None else None
+
+        if cached is not None:
+            data = cached
+            self.logger.info(f'serve fused result from cache [{cache_key[:16]}]')
+        else:
+            if isinstance(data, Iterator) and not isinstance(data, pa.RecordBatchReader):
+                # a fused plan runs once over the whole stream, polars can only plan over collected data
+                data = batch_reader(data)
+
+                if data is None:
+                    return iter(())
+
+                if stage[0].use_package == 'polars':
+                    data = data.read_all()
+
+            plan = data
+            for transformer in stage:
+                plan = transformer._plan(plan)
+
+            data = stage[-1]._collect(plan)
+
+            if cache_key is not None:
+                RESULT_CACHE.put(cache_key, to_arrow(data))
+
+        set_fingerprint(fingerprint)
+
+        end_ns = perf_counter_ns()
+        elapsed_ns = end_ns - start_ns
+        formatted_time = format_perf_ns_to_time(elapsed_ns)
+
+        names = [transformer.name for transformer in stage]
+        self.logger.info(f"fused transformers {names} into one [{stage[-1].use_package}] plan, "
+                         f"completed in {formatted_time}")
+
+        return data
 
     def do_transform(self, data):
-        for transformer in self.__transformers:
-            data = transformer._transform(data=data)
+        for stage in self.__stages:
+            if len(stage) == 1:
+                data = stage[0]._transform(data=data)
+            else:
+                data = self._run_fused(stage, data)
 
         return data
 
 
+class FanOutTransformer(BaseTransformer):
+    TYPE = 'FAN_OUT_TRANSFORMER'
+
+    def __init__(self, config_dict, storage):
+        super().__init__(config_dict, storage)
+        self.configs = config_dict['branches']
+        self.max_workers: int = config_dict.get('max_workers', len(self.configs))
+        self.spill: bool = config_dict.get('spill', False)
+        self.spill_dir: str | None = config_dict.get('spill_dir', None)
+        self.__streamed = False
+
+        if storage is not None:
+            self.logger.warning('a fan-out transformer does not store its input, configure a storage per branch')
+
+        # unlike chained transformers, every branch ends in its own storage
+        self.__branches = [
+            TransformerManager.create_transformer(
+                cfg['transformer'],
+                StorageManager.create_storage(cfg['storage']) if cfg.get('storage', None) is not None else None
+            )
+            for cfg in self.configs
+        ]
+
+    @property
+    def branches(self) -> list[BaseTransformer]:
+        return list(self.__branches)
+
+    def _spill(self, data) -> str | None:
+        # write the shared input once as an arrow ipc file, branches read it back memory mapped
+        items = data if isinstance(data, Iterator) else [data]
+        batches = (
+            batch
+            for item in map(to_arrow, items)
+            for batch in (item.to_batches() if isinstance(item, pa.Table) else [item])
+        )
+
+        first = next(batches, None)
+
+        if first is None:
+            return None
+
+        fd, spill_path = tempfile.mkstemp(prefix=f'{self.name}-', suffix='.arrow', dir=self.spill_dir)
+        num_rows = 0
+
+        with os.fdopen(fd, 'wb') as sink, pa.ipc.new_file(sink, first.schema) as writer:
+            for batch in itertools.chain([first], batches):
+                writer.write_batch(batch)
+                num_rows += batch.num_rows
+
+        self.logger.info(f'spilled {num_rows} row(s) to [{spill_path}]')
+        return spill_path
+
+    @staticmethod
+    def _replay(spill_path: str) -> Iterator[pa.RecordBatch]:
+        reader = pa.ipc.open_file(pa.memory_map(spill_path))
+
+        for i in range(reader.num_record_batches):
+            yield reader.get_batch(i)
+
+    def _run_branch(self, branch: BaseTransformer, data, spill_path: str | None):
+        if spill_path is not None:
+            data = self._replay(spill_path) if self.__streamed else pa.ipc.open_file(pa.memory_map(spill_path)).read_all()
+
+        branch._transform(data=data)
+
+    def _transform(self, data):
+        self.__streamed = isinstance(data, Iterator)
+
+        if self.__streamed:
+            # the stream is consumed before any branch stores, stored batches no longer map to extracted ones
+            disable_batch_checkpoints()
+
+        with self.metrics.measure(None if self.__streamed else data) as run:
+            self.do_transform(data=self.metrics.count_input(data) if self.__streamed else data)
+
+        formatted_time = format_perf_ns_to_time(run.wall_ns)
+
+        self.logger.info(f'transformer [{self.name}] completed {len(self.__branches)} branch(es) in {formatted_time}')
+
+    def do_transform(self, data):
+        # the input is read once, streams can only be replayed from a spill file
+        spill_path = self._spill(data) if self.__streamed or self.spill else None
+
+        if spill_path is None and self.__streamed:
+            self.logger.warning('no batches to fan out')
+            return None
+
+        try:
+            # every branch starts from the lineage of the shared input
+            if self.max_workers <= 1:
+                for branch in self.__branches:
+                    contextvars.copy_context().run(self._run_branch, branch, data, spill_path)
+            else:
+                self.logger.info(f'run {len(self.__branches)} branch(es) with {self.max_workers} worker(s)')
+
+                with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                    futures = [
+                        pool.submit(contextvars.copy_context().run, self._run_branch, branch, data, spill_path)
+                        for branch in self.__branches
+                    ]
+
+                    for future in futures:
+                        future.result()
+        finally:
+            if spill_path is not None:
+                os.remove(spill_path)
+
+        return None
+
+
 class TransformerManager(object):
     TRANSFORMERS: dict = {
         BaseTransformer.TYPE: BaseTransformer,
         ChainTransformer.TYPE: ChainTransformer,
+        FanOutTransformer.TYPE: FanOutTransformer,
         NoOpTransformer.TYPE: NoOpTransformer,
         QueryTransformer.TYPE: QueryTransformer
     }
@@ -1,11 +1,19 @@
 import logging
-from time import perf_counter_ns
+from collections.abc import Iterator
+
+import pyarrow as pa
 from abc import (
     ABC,
     abstractmethod
 )
 
 from ..storages import BaseStorage
+from ..metrics import StageMetrics
+from ..cache import (
+    current_fingerprint,
+    derive_fingerprint,
+    set_fingerprint
+)
 from ...utils import format_perf_ns_to_time
 
 
@@ -18,23 +26,49 @@ class BaseTransformer(ABC):
         self.storage = storage
         self.name = self.config_dict['name']
         self.logger = logging.getLogger(self.name)
+        self.metrics = StageMetrics('transformer', self.name, self.config_dict)
 
     def _transform(self, data):
-        start_ns = perf_counter_ns()
+        # a record batch reader is one dataset, a query scans it once
+        if isinstance(data, Iterator) and not isinstance(data, pa.RecordBatchReader):
+            data = self._transform_batches(data)
+        else:
+            with self.metrics.measure(data) as run:
+                data = run.output(self.do_transform(data=data))
 
-        data = self.do_transform(data=data)
+            formatted_time = format_perf_ns_to_time(run.wall_ns)
 
-        end_ns = perf_counter_ns()
-        elapsed_ns = end_ns - start_ns
-        formatted_time = format_perf_ns_to_time(elapsed_ns)
+            self.logger.info(f'transformer [{self.name}] completed in {formatted_time}')
 
-        self.logger.info(f'transformer [{self.name}] completed in {formatted_time}')
+            # later stages see the lineage of this output
+            set_fingerprint(derive_fingerprint(current_fingerprint(), self.signature()))
 
         if self.storage is None:
             return data
 
         return self.storage._store(data=data)
 
+    def _transform_batches(self, batches: Iterator) -> Iterator:
+        # lazily transform one record batch at a time, the storage drives the iteration
+        elapsed_ns = 0
+        num_batches = 0
+
+        for batch in batches:
+            with self.metrics.measure(batch, batch=True) as run:
+                batch = run.output(self.do_transform(data=batch))
+
+            elapsed_ns += run.wall_ns
+            num_batches += 1
+
+            yield batch
+
+        formatted_time = format_perf_ns_to_time(elapsed_ns)
+        self.logger.info(f'transformer [{self.name}] completed {num_batches} batch(es) in {formatted_time}')
+
+    def signature(self) -> dict | None:
+        # what the stage does to its input, None for stages that return their input unchanged
+        return {'type': self.TYPE, 'config': self.config_dict}
+
     @abstractmethod
     def do_transform(self, data):
         raise NotImplementedError()
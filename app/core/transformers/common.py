@@ -1,10 +1,37 @@
-import duckdb
-import polars as pl
+import json
+import threading
 
+import pyarrow as pa
+
+from collections.abc import Iterator
 from typing import Literal
 from pyarrow import Table
 
 from .base import BaseTransformer
+from ..scans import FileScan
+from ..frames import (
+    Frame,
+    batch_reader,
+    to_arrow
+)
+from ..cache import (
+    RESULT_CACHE,
+    current_fingerprint,
+    derive_fingerprint,
+    normalize_query
+)
+from ..budget import BUDGET
+from ..column_types import (
+    duckdb_columns,
+    polars_schema
+)
+from ..engines import EngineManager
+
+duckdb = EngineManager.get_engine('duckdb')
+pl = EngineManager.get_engine('polars')
+
+# plan operators whose output rows each depend on a single input row, besides the scan of the input
+ROW_LOCAL_OPERATORS = {'PROJECTION', 'FILTER', 'UNNEST'}
 
 
 class NoOpTransformer(BaseTransformer):
@@ -13,6 +40,9 @@ class NoOpTransformer(BaseTransformer):
     def __init__(self, config_dict, storage):
         super().__init__(config_dict, storage)
 
+    def signature(self) -> dict | None:
+        return None
+
     def do_transform(self, data):
         self.logger.info(f'initiating data transformation task')
         return data
@@ -26,25 +56,189 @@ class QueryTransformer(BaseTransformer):
         self.use_package: Literal['polars', 'duckdb'] = self.config_dict['use_package']
         self.query: str = self.config_dict['query']
         self.table_name: str = self.config_dict['table_name']
+        self.cache: bool = self.config_dict.get('cache', True)
+        # fused plans bind the input under a name of their own, the query sees it as table_name
+        self.__alias = f'__etl_input_{id(self):x}'
+        self.__fused_query = (f'WITH "{self.table_name}" AS (SELECT * FROM "{self.__alias}") '
+                              f'SELECT * FROM ({self.query})')
+        self.__conn = None
+        # polars sql contexts must stay on the thread that created them
+        self.__local = threading.local()
+        self.__row_local: dict[str, bool] = {}
+
+    @staticmethod
+    def _duckdb():
+        # the thread's cursor, shared by every query so fused plans stay on one connection
+        return BUDGET.duckdb_cursor()
+
+    def _connection(self):
+        # long lived and owned by the transformer, the input is registered under table_name
+        if self.__conn is None:
+            self.__conn = BUDGET.duckdb_connection().cursor()
+
+        return self.__conn
+
+    def _context(self) -> 'pl.SQLContext':
+        if getattr(self.__local, 'ctx', None) is None:
+            self.__local.ctx = pl.SQLContext()
+
+        return self.__local.ctx
+
+    def _row_local(self, schema: pa.Schema) -> bool:
+        # whether the query gives the same result per batch as over the whole input, from the duckdb plan
+        key = schema.to_string()
+
+        if key not in self.__row_local:
+            conn = self._duckdb()
+            conn.register(self.table_name, schema.empty_table())
+
+            try:
+                plan = json.loads(conn.execute(f'EXPLAIN (FORMAT JSON) {self.query}').fetchall()[0][1])
+                operators = []
+                nodes = list(plan)
+
+                while bool(nodes):
+                    node = nodes.pop()
+                    operators.append(node['name'].strip())
+                    nodes.extend(node.get('children', []))
+
+                scans = [operator for operator in operators if operator.endswith('_SCAN')]
+                self.__row_local[key] = len(scans) == 1 and all(
+                    operator in ROW_LOCAL_OPERATORS for operator in operators if not operator.endswith('_SCAN')
+                )
+            except duckdb.Error:
+                # duckdb can not plan it (polars dialect), the query sees the whole input
+                self.__row_local[key] = False
+            finally:
+                conn.unregister(self.table_name)
+
+        return self.__row_local[key]
+
+    def _transform(self, data):
+        if isinstance(data, Iterator) and not isinstance(data, pa.RecordBatchReader):
+            reader = batch_reader(data)
+
+            if reader is None:
+                data = iter(())
+            elif self._row_local(reader.schema):
+                # filters and projections stay streamed, one query per batch
+                data = (batch for batch in reader)
+            elif self.use_package == 'duckdb':
+                self.logger.warning(f'query aggregates, sorts or joins across rows, run it once over the stream')
+                data = reader
+            else:
+                self.logger.warning(f'query aggregates, sorts or joins across rows, collect the stream for polars')
+                data = reader.read_all()
+
+        return super()._transform(data)
+
+    def __use_duckdb(self, data: Table | Frame) -> Table:
+        conn = self._connection()
+
+        # duckdb scans arrow, polars and pandas objects in place, no conversion needed
+        conn.register(self.table_name, data.native if isinstance(data, Frame) else data)
+
+        try:
+            return conn.execute(self.query).arrow()
+        finally:
+            conn.unregister(self.table_name)
+
+    def __use_polars(self, data: Table | Frame) -> Frame:
+        ctx = self._context()
+        ctx.register(self.table_name, Frame.wrap(data).to('polars'))
+
+        try:
+            if BUDGET.polars_streaming:
+                return Frame(ctx.execute(self.query, eager=False).collect(streaming=True), 'polars')
+
+            return Frame(ctx.execute(self.query, eager=True), 'polars')
+        finally:
+            ctx.unregister(self.table_name)
+
+    def _scan(self, scan: FileScan):
+        self.logger.info(f'push query down into {scan}')
+
+        if self.use_package == 'polars':
+            if scan.schema is not None:
+                # bound to the header by name, like the extractors
+                return pl.scan_csv(scan.files, schema_overrides=polars_schema(scan.schema))
+
+            return pl.scan_csv(scan.files, try_parse_dates=True)
+
+        options = BUDGET.duckdb_csv_options()
+
+        if scan.schema is not None:
+            types = duckdb_columns(scan.schema)
+            return self._duckdb().sql(f'select * from read_csv({scan.files}, types={types}, header=true{options})')
+
+        return self._duckdb().sql(f'select * from read_csv({scan.files}{options})')
 
-    def __use_duckdb(self, data: Table) -> Table:
-        # always replace table_name with the argument name or variable name for arrow.Table
-        # (self, data: Table) ---- [use 'data']
+    def _relation(self, data):
+        conn = self._duckdb()
 
-        query = self.query.replace(self.table_name, 'data')
+        if isinstance(data, duckdb.DuckDBPyRelation):
+            return data
 
-        return duckdb.sql(query).arrow()
+        if isinstance(data, Frame) and data.engine == 'pandas':
+            return conn.from_df(data.native)
 
-    def __use_polars(self, data: Table) -> Table:
-        # always replace table_name with the variable name used in pl.SQLContext to register frames
-        # pl.SQLContext(frames={'data': pl.from_arrow(data)}) ---- [use 'data']
+        return conn.from_arrow(data.native if isinstance(data, Frame) else data)
 
-        query = self.query.replace(self.table_name, 'data')
+    def _plan(self, data):
+        # build the query lazily on top of data, which is a Table, a FileScan or the plan of a previous query
+        if isinstance(data, FileScan):
+            data = self._scan(data)
 
-        ctx = pl.SQLContext(frames={'data': pl.from_arrow(data)})
-        return ctx.execute(query, eager=True).to_arrow()
+        if self.use_package == 'polars':
+            if not isinstance(data, pl.LazyFrame):
+                data = Frame.wrap(data).to('polars').lazy()
 
-    def do_transform(self, data: Table) -> Table:
+            ctx = self._context()
+            ctx.register(self.table_name, data)
+
+            try:
+                return ctx.execute(self.query, eager=False)
+            finally:
+                ctx.unregister(self.table_name)
+
+        # every stage of a fused plan runs on the thread's cursor, stages may share table_name
+        return self._relation(data).query(self.__alias, self.__fused_query)
+
+    def _collect(self, plan) -> Table | Frame:
+        if self.use_package == 'polars':
+            return Frame(plan.collect(streaming=BUDGET.polars_streaming), 'polars')
+
+        return plan.arrow()
+
+    def signature(self) -> dict | None:
+        return {'type': self.TYPE, 'engine': self.use_package, 'table_name': self.table_name,
+                'query': normalize_query(self.query)}
+
+    def _cache_key(self) -> str | None:
+        # only data of a known lineage is cached
+        if not self.cache or not RESULT_CACHE.enabled or current_fingerprint() is None:
+            return None
+
+        return derive_fingerprint(current_fingerprint(), self.signature())
+
+    def do_transform(self, data: Table | Frame) -> Table | Frame:
+        cache_key = self._cache_key()
+
+        if cache_key is not None:
+            cached = RESULT_CACHE.get(cache_key)
+
+            if cached is not None:
+                self.logger.info(f'serve result from cache [{cache_key[:16]}]')
+                return cached
+
+        result = self._run(data)
+
+        if cache_key is not None:
+            RESULT_CACHE.put(cache_key, to_arrow(result))
+
+        return result
+
+    def _run(self, data: Table | Frame) -> Table | Frame:
         self.logger.info(f"use 'package' = [{self.use_package}] to transform data")
 
         package_mgr: dict = {
@@ -52,5 +246,8 @@ class QueryTransformer(BaseTransformer):
             'duckdb': self.__use_duckdb
         }
 
+        if isinstance(data, FileScan):
+            return self._collect(self._plan(data))
+
         fn = package_mgr[self.use_package]
         return fn(data)
@@ -0,0 +1,9 @@
+from .synthetic import (
+    Vocabulary,
+    generate_table
+)
+from .writer import (
+    plan_files,
+    write_file,
+    write_dataset
+)
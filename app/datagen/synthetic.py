@@ -0,0 +1,50 @@
+from datetime import date
+
+import numpy as np
+import pyarrow as pa
+
+from faker import Faker
+
+START_DATE = date(2020, 1, 1)
+END_DATE = date(2025, 1, 1)
+
+
+class Vocabulary(object):
+    # faker is only used to build small value pools, rows are drawn from them with numpy
+
+    def __init__(self, seed: int = 0, num_names: int = 5_000, num_cities: int = 1_000) -> None:
+        fake = Faker()
+        fake.seed_instance(seed)
+
+        self.names = np.array([fake.name() for _ in range(num_names)], dtype=object)
+        self.cities = np.array([fake.city() for _ in range(num_cities)], dtype=object)
+
+
+def generate_table(n_rows: int, seed: int = 0, offset: int = 0, vocabulary: Vocabulary | None = None) -> pa.Table:
+    # same columns as generate_dataset.py, 'offset' continues the id sequence of a previous chunk
+    vocabulary = Vocabulary(seed) if vocabulary is None else vocabulary
+    rng = np.random.default_rng([seed, offset])
+
+    start_day = (START_DATE - date(1970, 1, 1)).days
+    end_day = (END_DATE - date(1970, 1, 1)).days
+
+    names = pa.DictionaryArray.from_arrays(
+        pa.array(rng.integers(0, len(vocabulary.names), size=n_rows), type=pa.int32()),
+        pa.array(vocabulary.names, type=pa.string())
+    )
+    cities = pa.DictionaryArray.from_arrays(
+        pa.array(rng.integers(0, len(vocabulary.cities), size=n_rows), type=pa.int32()),
+        pa.array(vocabulary.cities, type=pa.string())
+    )
+
+    return pa.table({
+        'id': np.arange(offset + 1, offset + n_rows + 1, dtype=np.int64),
+        'name': names.cast(pa.string()),
+        'age': rng.integers(18, 70, size=n_rows, dtype=np.int64),
+        'city': cities.cast(pa.string()),
+        'salary': rng.uniform(30_000, 120_000, size=n_rows),
+        'signup_date': pa.array(rng.integers(start_day, end_day, size=n_rows, dtype=np.int32)).cast(pa.date32())
+    })
+
+
+__all__ = ['Vocabulary', 'generate_table']
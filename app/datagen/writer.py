@@ -0,0 +1,272 @@
+import io
+import os
+import logging
+import argparse
+
+from collections import deque
+from collections.abc import (
+    Callable,
+    Iterator
+)
+from concurrent.futures import (
+    Executor,
+    ProcessPoolExecutor
+)
+from functools import partial
+from typing import Literal
+
+import pyarrow as pa
+import pyarrow.csv as pc
+
+from .synthetic import (
+    Vocabulary,
+    generate_table
+)
+from ..core.engines import EngineManager
+
+pl = EngineManager.get_engine('polars')
+pq = EngineManager.get_engine('parquet')
+
+FILE_EXTS: dict = {
+    'csv': 'csv',
+    'parquet': 'parquet',
+    'jsonl': 'jsonl'
+}
+
+# one vocabulary per seed and worker process, building it is the only faker work
+_vocabularies: dict[int, Vocabulary] = {}
+
+
+def _vocabulary(seed: int) -> Vocabulary:
+    if seed not in _vocabularies:
+        _vocabularies[seed] = Vocabulary(seed)
+
+    return _vocabularies[seed]
+
+
+def plan_files(n_rows: int, num_files: int, path: str, key: str,
+               file_format: Literal['csv', 'parquet', 'jsonl'] = 'csv') -> list[dict]:
+    # rows are split evenly, ids stay one sequence over all files
+    num_files = max(1, min(num_files, n_rows))
+    file_ext = FILE_EXTS[file_format]
+    files = []
+    offset = 0
+
+    for i in range(num_files):
+        rows = n_rows // num_files + (1 if i < n_rows % num_files else 0)
+        name = f'{key}.{file_ext}' if num_files == 1 else f'{key}-{i:05d}.{file_ext}'
+
+        files.append({'path': os.path.join(path, name), 'rows': rows, 'offset': offset})
+        offset += rows
+
+    return files
+
+
+def _chunk_tasks(file: dict, chunk_rows: int) -> list[dict]:
+    return [
+        {'offset': file['offset'] + start, 'rows': min(chunk_rows, file['rows'] - start), 'first': start == 0}
+        for start in range(0, file['rows'], chunk_rows)
+    ]
+
+
+def _encode_csv(table: pa.Table, first: bool) -> bytes:
+    sink = pa.BufferOutputStream()
+    pc.write_csv(table, sink, pc.WriteOptions(include_header=first))
+    return sink.getvalue().to_pybytes()
+
+
+def _encode_jsonl(table: pa.Table, first: bool) -> bytes:
+    sink = io.BytesIO()
+    pl.from_arrow(table).write_ndjson(sink)
+    return sink.getvalue()
+
+
+def _generate_chunk(task: dict, file_format: Literal['csv', 'parquet', 'jsonl'], seed: int) -> bytes | pa.Table:
+    # module level so it can be pickled into a ProcessPoolExecutor
+    encoders: dict = {
+        'csv': _encode_csv,
+        'parquet': lambda table, first: table,
+        'jsonl': _encode_jsonl
+    }
+
+    # a chunk only depends on the seed and its offset, files are the same for any number of workers
+    table = generate_table(task['rows'], seed=seed, offset=task['offset'], vocabulary=_vocabulary(seed))
+    return encoders[file_format](table, task['first'])
+
+
+def _write_bytes(path: str, chunks: Iterator[bytes]):
+    with pa.OSFile(path, 'wb') as sink:
+        for chunk in chunks:
+            sink.write(chunk)
+
+
+def _write_parquet(path: str, chunks: Iterator[pa.Table], compression: str | None):
+    writer = None
+
+    try:
+        for table in chunks:
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema, compression=compression or 'snappy')
+
+            # every chunk is one row group
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def _write(file: dict, file_format: Literal['csv', 'parquet', 'jsonl'], chunks: Iterator,
+           compression: str | None) -> dict:
+    # only parquet compresses, csv and jsonl chunks are appended as encoded
+    writers: dict = {
+        'csv': _write_bytes,
+        'parquet': partial(_write_parquet, compression=compression),
+        'jsonl': _write_bytes
+    }
+
+    # written under a temporary name, readers never pick up a partial file
+    tmp_path = f"{file['path']}.tmp"
+    writers[file_format](tmp_path, chunks)
+    os.replace(tmp_path, file['path'])
+
+    return {**file, 'bytes': os.path.getsize(file['path'])}
+
+
+def _map_chunks(pool: Executor, fn: Callable, tasks: list[dict], queue_size: int) -> Iterator:
+    # at most 'queue_size' chunks are generated ahead of the writer, results keep the task order
+    pending = deque()
+
+    for task in tasks:
+        pending.append(pool.submit(fn, task))
+
+        if len(pending) >= queue_size:
+            yield pending.popleft().result()
+
+    while bool(pending):
+        yield pending.popleft().result()
+
+
+def write_file(file: dict, file_format: Literal['csv', 'parquet', 'jsonl'] = 'csv', seed: int = 0,
+               chunk_rows: int = 1_000_000, compression: str | None = None) -> dict:
+    # module level so it can be pickled into a ProcessPoolExecutor
+    chunks = (_generate_chunk(task, file_format, seed) for task in _chunk_tasks(file, chunk_rows))
+    return _write(file, file_format, chunks, compression)
+
+
+def write_dataset(n_rows: int, path: str, key: str = 'synthetic', num_files: int = 1,
+                  file_format: Literal['csv', 'parquet', 'jsonl'] = 'csv', seed: int = 0,
+                  chunk_rows: int = 1_000_000, max_workers: int | None = None,
+                  compression: str | None = None) -> list[dict]:
+    logger = logging.getLogger('datagen')
+
+    assert file_format in FILE_EXTS, f'unknown file format: [{file_format}]'
+    assert compression is None or file_format == 'parquet', "'compression' is only supported by parquet"
+
+    os.makedirs(path, exist_ok=True)
+
+    files = plan_files(n_rows, num_files, path, key, file_format)
+    max_workers = max_workers or os.cpu_count() or 1
+
+    logger.info(f"write {n_rows} row(s) into {len(files)} {file_format} file(s) in [{path}] "
+                f"with {max_workers} worker(s), 'seed' = {seed}")
+
+    if max_workers <= 1:
+        return [write_file(file, file_format, seed, chunk_rows, compression) for file in files]
+
+    if len(files) >= max_workers:
+        # a file is written by one worker, the pool spreads files
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = [pool.submit(write_file, file, file_format, seed, chunk_rows, compression) for file in files]
+            return [future.result() for future in futures]
+
+    # fewer files than workers: the pool generates and encodes chunks, they are written here in order
+    logger.info(f"generate chunks of {chunk_rows} row(s) in parallel")
+    generate = partial(_generate_chunk, file_format=file_format, seed=seed)
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        return [
+            _write(file, file_format, _map_chunks(pool, generate, _chunk_tasks(file, chunk_rows), 2 * max_workers),
+                   compression)
+            for file in files
+        ]
+
+
+def main(args) -> int:
+    logging.basicConfig(level=logging.INFO)
+
+    files = write_dataset(
+        n_rows=args.rows,
+        path=args.path,
+        key=args.key,
+        num_files=args.files,
+        file_format=args.format,
+        seed=args.seed,
+        chunk_rows=args.chunk_rows,
+        max_workers=args.workers,
+        compression=args.compression
+    )
+
+    for file in files:
+        print(f"{file['path']}  {file['rows']:>13,} rows  {file['bytes'] / (1024 * 1024):>10.1f}MB")
+
+    return 0
+
+
+def parse_args(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(prog='python -m app.datagen')
+    parser.add_argument(
+        '--rows',
+        help='total number of rows',
+        type=int,
+        default=10_000_000
+    )
+    parser.add_argument(
+        '--files',
+        help='number of files the rows are split into',
+        type=int,
+        default=1
+    )
+    parser.add_argument(
+        '--format',
+        help='output file format',
+        choices=list(FILE_EXTS),
+        default='csv'
+    )
+    parser.add_argument(
+        '--path',
+        help='output directory',
+        default='data'
+    )
+    parser.add_argument(
+        '--key',
+        help='file name prefix',
+        default='synthetic'
+    )
+    parser.add_argument(
+        '--seed',
+        help='dataset seed, the same seed gives the same files',
+        type=int,
+        default=0
+    )
+    parser.add_argument(
+        '--chunk-rows',
+        help='rows generated and written at a time',
+        type=int,
+        default=1_000_000
+    )
+    parser.add_argument(
+        '--workers',
+        help='worker processes, defaults to the number of cpus',
+        type=int,
+        default=None
+    )
+    parser.add_argument(
+        '--compression',
+        help='parquet compression codec',
+        default=None
+    )
+
+    return parser.parse_args(argv)
+
+
+__all__ = ['plan_files', 'write_file', 'write_dataset', 'main', 'parse_args']
@@ -1,8 +1,10 @@
 import os
 import sys
 import yaml
+import signal
 import argparse
 import logging
+import threading
 
 from fsspec.implementations.local import LocalFileSystem
 from logging import Logger
@@ -13,18 +15,37 @@ from .utils import format_perf_ns_to_time
 
 from .core.storages import StorageManager
 from .core.transformers import TransformerManager
-from .core.extractors import ExtractorManager
+from .core.extractors import (
+    BaseExtractor,
+    ExtractorManager
+)
+from .core.planner import plan_pushdown
+from .core.budget import BUDGET
+from .core.cache import RESULT_CACHE
+from .core.engines import EngineManager
+from .core.metrics import METRICS
 
+# longest wait between two polls after consecutive failures in watch mode
+WATCH_MAX_BACKOFF = 300
 
-def run_etl(config: Configuration, logger: Logger):
+
+def build_etl(config: Configuration, logger: Logger) -> BaseExtractor:
     logger.info(f'initializing etl pipeline')
 
     app_name: str = config['app_name'].get(str)
+    meta_config: dict = config['meta'].get(dict)
 
-    storage_config: dict = config['storage'].get(dict)
-    storage = StorageManager.create_storage(
-        config=storage_config
-    )
+    BUDGET.configure(meta_config.get('memory', None))
+    RESULT_CACHE.configure(meta_config.get('cache', None))
+
+    # a fan-out transformer stores per branch, the top level storage is optional then
+    storage = None
+
+    if config['storage'].exists():
+        storage_config: dict = config['storage'].get(dict)
+        storage = StorageManager.create_storage(
+            config=storage_config
+        )
 
     transformer_config: dict = config['transformer'].get(dict)
     transformer = TransformerManager.create_transformer(
@@ -38,7 +59,90 @@ def run_etl(config: Configuration, logger: Logger):
         transformer=transformer
     )
 
+    if meta_config.get('pushdown', False):
+        plan_pushdown(extractor, transformer, logger)
+    elif BUDGET.enabled:
+        # a query must see all rows, inputs over the budget are scanned by its engine rather than streamed
+        plan_pushdown(extractor, transformer, logger, over_budget=True)
+
+    return extractor
+
+
+def export_metrics(config: Configuration, logger: Logger):
+    metrics_config: dict = config['meta'].get(dict).get('metrics', None) or {}
+    json_path = metrics_config.get('json', None)
+    prometheus_path = metrics_config.get('prometheus', None)
+
+    for conversion, values in METRICS.conversions.items():
+        logger.info(f"engine conversion [{conversion}]: {values['count']} time(s), {values['bytes']} byte(s)")
+
+    if bool(METRICS.counters):
+        logger.info(f'counters: {METRICS.counters}')
+
+    if json_path is None and prometheus_path is None:
+        return
+
+    METRICS.export(json_path=json_path, prometheus_path=prometheus_path)
+    logger.info(f'metrics exported to {[path for path in [json_path, prometheus_path] if path is not None]}')
+
+
+def run_etl(config: Configuration, logger: Logger):
+    extractor = build_etl(config, logger)
     extractor._extract()
+    export_metrics(config, logger)
+
+
+def watch_etl(config: Configuration, logger: Logger, poll_interval: float):
+    # build the pipeline once and keep polling the extractor for new files until stopped
+    extractor = build_etl(config, logger)
+
+    if getattr(extractor, 'reprocess', False):
+        logger.warning("'reprocess' is ignored in watch mode, only new files are extracted")
+        extractor.reprocess = False
+
+    if getattr(extractor, 'fail_no_files', False):
+        logger.warning("'fail_no_files' is ignored in watch mode, a poll without new files is normal")
+        extractor.fail_no_files = False
+
+    stop_event = threading.Event()
+
+    def _stop(signum, frame):
+        logger.info(f'received signal {signal.Signals(signum).name}, stopping after the current batch')
+        stop_event.set()
+
+    signal.signal(signal.SIGINT, _stop)
+    signal.signal(signal.SIGTERM, _stop)
+
+    logger.info(f'watching for new files every {poll_interval}s')
+    num_polls = 0
+    num_failures = 0
+
+    while not stop_event.is_set():
+        start_ns = perf_counter_ns()
+        num_polls += 1
+
+        try:
+            extractor._extract()
+            export_metrics(config, logger)
+            num_failures = 0
+        except Exception:
+            # a failed poll is retried, the next run resumes what it committed
+            num_failures += 1
+            logger.exception(f'poll {num_polls} failed, {num_failures} failure(s) in a row')
+
+        elapsed_ns = perf_counter_ns() - start_ns
+        logger.debug(f'poll {num_polls} completed in {format_perf_ns_to_time(elapsed_ns)}')
+
+        # consecutive failures back off exponentially, up to WATCH_MAX_BACKOFF seconds
+        wait = poll_interval
+
+        if num_failures > 0:
+            wait = min(poll_interval * 2 ** num_failures, max(poll_interval, WATCH_MAX_BACKOFF))
+            logger.info(f'retry in {wait}s')
+
+        stop_event.wait(wait)
+
+    logger.info(f'watch stopped after {num_polls} poll(s)')
 
 
 def main(args):
@@ -79,7 +183,12 @@ def main(args):
     logging.getLogger().setLevel(log_level.upper())
     logger = logging.getLogger(app_name)
 
-    run_etl(app_config, logger)
+    if args.watch:
+        watch_etl(app_config, logger, args.poll_interval)
+    else:
+        run_etl(app_config, logger)
+
+    logger.info(f'engines loaded: {EngineManager.loaded_engines()}')
 
     end_ns = perf_counter_ns()
     elapsed_ns = end_ns - start_ns
@@ -117,6 +226,18 @@ if __name__ == "__main__":
         help='configuration file name',
         required=True
     )
+    parser.add_argument(
+        '--watch',
+        help='keep the pipeline running and process new files as they land',
+        action='store_true'
+    )
+    parser.add_argument(
+        '--poll-interval',
+        help='seconds between two polls in watch mode',
+        required=False,
+        type=float,
+        default=5.0
+    )
 
     args = parser.parse_args()
     res = -1
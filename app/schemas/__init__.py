@@ -1 +1,6 @@
-from .config_params import FileFilterParams
+from .config_params import (
+    CoalesceParams,
+    FileFilterParams,
+    MemoryBudgetParams,
+    ResultCacheParams
+)
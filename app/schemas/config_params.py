@@ -1,11 +1,113 @@
-from pydantic import Field
+import re
+
+from fnmatch import translate
+from typing import Literal
+from pydantic import (
+    Field,
+    PrivateAttr
+)
 
 from .base import Base
 
 
+def _compile_keys(keys: list[str] | None) -> re.Pattern | None:
+    if not bool(keys):
+        return None
+
+    return re.compile('|'.join(re.escape(key) for key in keys))
+
+
 class FileFilterParams(Base):
     keep_latest: bool = Field(default=False)
     include: list[str] | None = Field(default=None)
     exclude: list[str] | None = Field(default=None)
     key: str | None = Field(default=None)
     skip: int | None = Field(default=None)
+    pattern: str | None = Field(default=None)
+    recursive: bool = Field(default=False)
+
+    _include_re: re.Pattern | None = PrivateAttr(default=None)
+    _exclude_re: re.Pattern | None = PrivateAttr(default=None)
+    _pattern_re: re.Pattern | None = PrivateAttr(default=None)
+
+    def model_post_init(self, __context) -> None:
+        # compile once, matching runs for every listed file
+        self._include_re = _compile_keys(self.include)
+        self._exclude_re = _compile_keys(self.exclude)
+        self._pattern_re = None if self.pattern is None else re.compile(translate(self.pattern))
+
+    def match_include(self, file_key: str) -> bool:
+        return self._include_re is None or self._include_re.search(file_key) is not None
+
+    def match_exclude(self, file_key: str) -> bool:
+        return self._exclude_re is None or self._exclude_re.search(file_key) is None
+
+    def match_pattern(self, relative_path: str) -> bool:
+        return self._pattern_re is None or self._pattern_re.match(relative_path) is not None
+
+
+_SIZE_UNITS: dict = {
+    'b': 1,
+    'kb': 1000, 'mb': 1000 ** 2, 'gb': 1000 ** 3, 'tb': 1000 ** 4,
+    'kib': 1024, 'mib': 1024 ** 2, 'gib': 1024 ** 3, 'tib': 1024 ** 4
+}
+
+
+def _parse_size(size: str | int | None) -> int | None:
+    if size is None or isinstance(size, int):
+        return size
+
+    match = re.fullmatch(r'\s*([\d.]+)\s*([a-zA-Z]*)\s*', size)
+    unit = (match.group(2) or 'b').lower() if match is not None else None
+
+    assert unit in _SIZE_UNITS, f'invalid size: [{size}]'
+
+    return int(float(match.group(1)) * _SIZE_UNITS[unit])
+
+
+class MemoryBudgetParams(Base):
+    memory_limit: str | int | None = Field(default=None)
+    temp_directory: str | None = Field(default=None)
+    threads: int | None = Field(default=None)
+    polars_streaming: bool = Field(default=True)
+    buffer_fraction: float = Field(default=0.25, gt=0, le=1)
+
+    _limit_bytes: int | None = PrivateAttr(default=None)
+
+    def model_post_init(self, __context) -> None:
+        self._limit_bytes = _parse_size(self.memory_limit)
+
+    @property
+    def limit_bytes(self) -> int | None:
+        return self._limit_bytes
+
+
+class CoalesceParams(Base):
+    # a batch is handed on once any target is reached
+    target_rows: int | None = Field(default=None, gt=0)
+    target_size: str | int | None = Field(default=None)
+    max_wait: float | None = Field(default=None, gt=0)
+
+    _target_bytes: int | None = PrivateAttr(default=None)
+
+    def model_post_init(self, __context) -> None:
+        self._target_bytes = _parse_size(self.target_size)
+
+    @property
+    def target_bytes(self) -> int | None:
+        return self._target_bytes
+
+
+class ResultCacheParams(Base):
+    dir: str | None = Field(default=None)
+    max_size: str | int | None = Field(default=None)
+    format: Literal['ipc', 'parquet'] = Field(default='ipc')
+
+    _max_bytes: int | None = PrivateAttr(default=None)
+
+    def model_post_init(self, __context) -> None:
+        self._max_bytes = _parse_size(self.max_size)
+
+    @property
+    def max_bytes(self) -> int | None:
+        return self._max_bytes